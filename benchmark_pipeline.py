@@ -0,0 +1,250 @@
+"""
+File: benchmark_pipeline.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Headless benchmark of the whole display pipeline,
+    loader -> buffer -> compose -> present -> trigger -> recording,
+    the triggers are sent into the simulated parallel port.
+
+    python benchmark_pipeline.py --synthetic 50 --interval 0
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import json
+import argparse
+import tempfile
+
+from util.constant import *
+from util.presenter import make_presenter
+from util.compose import Compositor
+from util.display_loop import DisplayLoop
+from util.frame_buffer import VeryFastVeryStableBuffer, PresenterCrossfade
+from util.image_loader import MyImage, list_local_images, image_size_from_rect
+from util.image_stack import read_stack_from_file_list
+from util.recording import RecordingSink
+from util.scheduler import DeadlineScheduler
+from util.timing import MonotonicClock, latency_breakdown
+
+from util.parallel.parallel import Parallel
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def synthesize_images(folder, count, size=(1024, 768)):
+    """Write the random smooth images into the folder.
+
+    Args:
+        folder (Path): The folder of the images.
+        count (int): The number of the images.
+        size (tuple, optional): The (width, height) of the images. Defaults to (1024, 768).
+
+    Returns:
+        Path: The folder.
+    """
+    folder = Path(folder)
+    rng = np.random.default_rng(0)
+    for i in range(count):
+        small = rng.integers(0, 256, (12, 16, 3), dtype=np.uint8)
+        img = cv2.resize(small, size, interpolation=cv2.INTER_CUBIC)
+        cv2.imwrite(str(folder.joinpath('{:04d}.jpg'.format(i))), img)
+    return folder
+
+
+def display_code(img_id):
+    """The trigger code of the key frame, as the player does.
+
+    Args:
+        img_id (str): The img_id of the key frame.
+
+    Returns:
+        int: The code, 4 refers the target image, 2 refers the others.
+    """
+    return 4 if img_id.startswith('target') else 2
+
+
+def run_benchmark(file_list, m=5, interval_ms=20, frames=None, presenter='null',
+                  presenter_options=None, crossfade_mode='buffer', backend='thread',
+                  workers=2, recording_path=None, policy='catch_up', trigger_mode='queue',
+                  flip_block_flag=True, counting_flag=True):
+    """Run the pipeline without the display, the frames are displayed by the DisplayLoop of the player.
+
+    Args:
+        file_list (list): The file_list of (path, img_id, tag).
+        m (int, optional): The frames between the key frames. Defaults to 5.
+        interval_ms (float, optional): The interval of the frames in milliseconds, 0 refers as fast as possible. Defaults to 20.
+        frames (int, optional): The number of the frames. Defaults to None, refers len(file_list) * m.
+        presenter (str, optional): The name of the presenter. Defaults to 'null'.
+        presenter_options (dict, optional): The options of the presenter. Defaults to None.
+        crossfade_mode (str, optional): The crossfade mode, 'buffer' or 'presenter'. Defaults to 'buffer'.
+        backend (str, optional): The synthesis backend, 'thread' or 'process'. Defaults to 'thread'.
+        workers (int, optional): The synthesis workers of the process backend. Defaults to 2.
+        recording_path (Path, optional): The session log. Defaults to None, refers the memory only.
+        policy (str, optional): The policy of the late frames, 'catch_up' or 'skip'. Defaults to 'catch_up'.
+        trigger_mode (str, optional): The trigger mode, 'queue' or 'present'. Defaults to 'queue'.
+        flip_block_flag (bool, optional): Whether draw the flip block. Defaults to True.
+        counting_flag (bool, optional): Whether draw the counting OSD. Defaults to True.
+
+    Returns:
+        dict: The report.
+    """
+    if frames is None:
+        frames = len(file_list) * m
+
+    presenter = make_presenter(presenter, 'benchmark', **(presenter_options or dict()))
+    image_rect = presenter.open()
+
+    # Loader
+    MyImage.image_size = image_size_from_rect(image_rect)
+    MyImage.resize_mode = 'fit'
+    tic = time.perf_counter()
+    images = read_stack_from_file_list(file_list)
+    load_seconds = time.perf_counter() - tic
+
+    # Buffer and compose
+    presenter_crossfade_flag = crossfade_mode == 'presenter'
+    compositor = Compositor(image_rect[2:], images.shape)
+    buffer = VeryFastVeryStableBuffer(
+        images, m=1 if presenter_crossfade_flag else m,
+        backend=backend, workers=workers, compositor=compositor)
+    buffer.start()
+
+    # The first key frame is the preroll, as the 'Press any key' frames of the player
+    buffer.pop()
+    if presenter_crossfade_flag:
+        buffer = PresenterCrossfade(buffer, presenter)
+
+    # Trigger, into the simulated port
+    parallel = Parallel()
+    parallel.reset('0', backend='simulated')
+
+    # Recording
+    clock = MonotonicClock()
+    recording = RecordingSink(capacity=max(4096, frames + 16), path=recording_path)
+    recording.start(meta=dict(clock_offset_ns=clock.offset_ns,
+                              frame_interval_ns=int(interval_ms * 1000000)))
+
+    scheduler = DeadlineScheduler(int(interval_ms * 1000000), policy=policy)
+
+    display_loop = DisplayLoop(
+        presenter, buffer, scheduler, parallel, clock, recording.record, display_code,
+        frames, m, compositor,
+        flip_block_flag=flip_block_flag,
+        counting_flag=counting_flag,
+        presenter_crossfade_flag=presenter_crossfade_flag,
+        trigger_mode=trigger_mode,
+        verbose=False)
+
+    tic = time.perf_counter()
+    display_loop.run()
+    display_seconds = time.perf_counter() - tic
+
+    buffer.stop()
+    parallel.close()
+    recording.stop()
+    presenter.close()
+
+    breakdown = latency_breakdown(recording.to_records())
+
+    return dict(
+        images=len(images),
+        image_shape=list(images.shape),
+        frame_shape=list(compositor.frame_shape),
+        load_seconds=load_seconds,
+        frames=frames,
+        display_seconds=display_seconds,
+        fps=frames / display_seconds,
+        # The stage without the timing, as the late without the deadline, is None
+        latency_ms={k: dict(mean=breakdown[k].mean(), p99=breakdown[k].quantile(0.99))
+                    if breakdown[k].notna().any() else None
+                    for k in ('late', 'imshow', 'poll_key', 'trigger')},
+        buffer=buffer.report(),
+        scheduler=scheduler.report(),
+        presenter=presenter.report(),
+        parallel=parallel.report(),
+        recording=recording.report(),
+    )
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Headless benchmark of the display pipeline')
+    parser.add_argument('--folder', type=Path, default=None,
+                        help='The folder of the images')
+    parser.add_argument('--synthetic', type=int, default=50,
+                        help='The number of the synthetic images if the folder is not provided')
+    parser.add_argument('--limit', type=int, default=200,
+                        help='The limit of the images in the folder')
+    parser.add_argument('-m', type=int, default=5,
+                        help='The frames between the key frames')
+    parser.add_argument('--interval', type=float, default=20,
+                        help='The interval of the frames in milliseconds, 0 refers as fast as possible')
+    parser.add_argument('--frames', type=int, default=None,
+                        help='The number of the frames, defaults to the images * m')
+    parser.add_argument('--presenter', default='null', choices=['null', 'gl'],
+                        help='The presenter, the gl presenter runs in the headless mode')
+    parser.add_argument('--size', type=int, nargs=2, default=[800, 600],
+                        help='The width and height of the surface')
+    parser.add_argument('--crossfade', default='buffer', choices=['buffer', 'presenter'],
+                        help='The crossfade mode')
+    parser.add_argument('--backend', default='thread', choices=['thread', 'process'],
+                        help='The synthesis backend')
+    parser.add_argument('--dump', type=Path, default=None,
+                        help='The folder of the dumped frames of the null presenter')
+    parser.add_argument('--recording', type=Path, default=None,
+                        help='The session log')
+    parser.add_argument('--policy', default='catch_up', choices=['catch_up', 'skip'],
+                        help='The policy of the late frames')
+    parser.add_argument('--trigger-mode', default='queue', choices=['queue', 'present'],
+                        help='The trigger mode')
+    parser.add_argument('--no-osd', action='store_true',
+                        help='Do not draw the flip block and the counting OSD')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='The json file of the report')
+    args = parser.parse_args()
+
+    if args.presenter == 'gl':
+        presenter_options = dict(headless=True, size=tuple(args.size))
+    else:
+        presenter_options = dict(size=tuple(args.size), dump_folder=args.dump)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.folder or synthesize_images(tmp, args.synthetic)
+        file_list = list_local_images(folder, limit=args.limit)
+
+        report = run_benchmark(file_list, m=args.m, interval_ms=args.interval,
+                               frames=args.frames, presenter=args.presenter,
+                               presenter_options=presenter_options,
+                               crossfade_mode=args.crossfade, backend=args.backend,
+                               recording_path=args.recording, policy=args.policy,
+                               trigger_mode=args.trigger_mode,
+                               flip_block_flag=not args.no_osd, counting_flag=not args.no_osd)
+
+    text = json.dumps(report, indent=2, default=str)
+    print(text)
+
+    if args.output is not None:
+        args.output.write_text(text)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -5,7 +5,11 @@ Date: 2023-07-11
 Copyright & Email: chuncheng.zhang@ia.ac.cn
 
 Purpose:
-    Amazing things
+    Check the time recording of the session,
+    the summary of the inter-frame intervals, the dropped frames and the drift is printed as json,
+    the figures are optional, they require the plotly.
+
+    python check_time_recording.py time_recording.bin --output summary.json --plot
 
 Functions:
     1. Requirements and constants
@@ -18,78 +22,97 @@ Functions:
 
 # %% ---- 2023-07-11 ------------------------
 # Requirements and constants
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+import json
+import argparse
+import numpy as np
+
+from pathlib import Path
 
-from rich import print
+from util.frame_stats import load_frames, summarize
+
+# The recording of the player, the session log is preferred
+DEFAULT_PATHS = [Path('time_recording.bin'), Path('time_recording.csv')]
 
 
 # %% ---- 2023-07-11 ------------------------
 # Function and class
-raw_data = pd.read_csv('time_recording.csv', index_col=0)
-if not 'code' in raw_data.columns:
-    raw_data['code'] = ''
 
-table = raw_data.query(
-    'recordEvent == "displayImage"').copy()
-table.index = range(len(table))
-print(table)
 
+def plot(path):
+    """Plot the display scatters, the violins of the intervals and the key frames vs. the key presses.
 
-# %% ---- 2023-07-11 ------------------------
-# Play ground
-times = table['time'].to_numpy() * 1000
-table.loc[1:, 'interval'] = times[1:] - times[:-1]
+    Args:
+        path (Path): The session log or the csv file.
+    """
+    # The plotly is only required by the plotting
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
 
-table = table.loc[2:]
+    meta, frames, key_press_t_ns = load_frames(path)
 
-table['mark'] = table['imgId'].map(
-    lambda e: 'key' if not pd.isna(e) else 'interpolate')
-print(table)
+    t0 = frames['t_ns'][:1]
+    t_ms = (frames['t_ns'] - t0) / 1e6
+    intervals = np.diff(t_ms)
+    frame_idx = frames['frame_idx'][1:]
+    key_flag = frames['key_flag'][1:]
 
+    fig = make_subplots(rows=1, cols=3, subplot_titles=(
+        'Display scatters', 'Violins histogram', 'Target vs. KeyPress'))
 
-# %% ---- 2023-07-11 ------------------------
-# Pending
-fig = px.scatter(table, x='frameIdx', y='interval', color='mark', opacity=0.5)
-trace1 = fig.data
-# fig.show()
+    for mark, select in [('key', key_flag), ('interpolate', ~key_flag)]:
+        fig.add_trace(go.Scattergl(x=frame_idx[select], y=intervals[select], mode='markers',
+                                   name=mark, opacity=0.5), row=1, col=1)
+        fig.add_trace(go.Violin(y=intervals[select], name=mark, box_visible=True),
+                      row=1, col=2)
+
+    # The key frames are in the rows of the image type, the prefix of the img_id,
+    # the key presses are in the row of the keyPress
+    key_t_ms = t_ms[frames['key_flag']]
+    ids, inverse = np.unique(frames['img_id'][frames['key_flag']], return_inverse=True)
+    key_type = np.array([e.split('.')[0] for e in ids], dtype=str)[inverse]
 
-fig = px.violin(table, y='interval', color='mark', box=True)
-trace2 = fig.data
-# fig.show()
+    for name in np.unique(key_type):
+        select = key_type == name
+        fig.add_trace(go.Scattergl(x=key_t_ms[select], y=key_type[select],
+                                   mode='markers', name=str(name), opacity=0.5), row=1, col=3)
+
+    fig.add_trace(go.Scattergl(x=(key_press_t_ns - t0) / 1e6, y=['keyPress'] * len(key_press_t_ns),
+                               mode='markers', name='keyPress', opacity=0.5), row=1, col=3)
+
+    fig.show()
 
 
 # %% ---- 2023-07-11 ------------------------
-# Pending
-df1 = raw_data.query('recordEvent == "displayImage"').copy()
-df1 = df1[df1['imgId'].map(lambda e: not pd.isna(e))].copy()
-df1['imgType'] = df1['imgId'].map(lambda d: d.split('.')[0])
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Check the time recording of the session')
+    parser.add_argument('path', type=Path, nargs='?', default=None,
+                        help='The session log (.bin) or the csv file, defaults to the time_recording.bin or time_recording.csv')
+    parser.add_argument('--nominal', type=float, default=None,
+                        help='The nominal inter-frame interval in milliseconds, defaults to the frame_interval_ns of the session log')
+    parser.add_argument('--output', type=Path, default=None,
+                        help='The json file of the summary')
+    parser.add_argument('--plot', action='store_true',
+                        help='Plot the figures, it requires the plotly')
+    args = parser.parse_args()
 
-df2 = raw_data.query('recordEvent == "keyPress"').copy()
-df2['imgType'] = 'keyPress'
+    path = args.path or next((p for p in DEFAULT_PATHS if p.is_file()), DEFAULT_PATHS[-1])
 
-df = pd.concat([df1, df2])
-df['size'] = 10
+    summary = summarize(path, nominal_ms=args.nominal)
+    text = json.dumps(summary, indent=2)
+    print(text)
 
-fig = px.scatter(df, x='time', y='imgType', hover_data='code',
-                 color='recordEvent', opacity=0.5, size='size', size_max=10)
-trace3 = fig.data
-# fig.show()
+    if args.output is not None:
+        args.output.write_text(text)
 
-# %%
-fig = make_subplots(rows=1, cols=3, subplot_titles=(
-    'Display scatters', 'Violins histogram', 'Target vs. KeyPress'))
+    if args.plot:
+        plot(path)
 
-for t in trace1:
-    fig.add_trace(t, row=1, col=1)
 
-for t in trace2:
-    fig.add_trace(t, row=1, col=2)
+# %% ---- 2023-07-11 ------------------------
+# Pending
 
-for t in trace3:
-    fig.add_trace(t, row=1, col=3)
 
-fig.show()
-# %%
+# %% ---- 2023-07-11 ------------------------
+# Pending
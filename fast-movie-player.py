@@ -22,7 +22,8 @@ import cv2
 # import torch
 import numpy as np
 from util.constant import *
-from util.toolbox import PreciseClock, pop, linear_interpolate
+from util.toolbox import pop, linear_interpolate
+from util.scheduler import DeadlineScheduler
 from util.image_loader import read_local_images
 
 
@@ -96,7 +97,7 @@ frames = int(display_seconds / (interval / 1000))
 print('Display with {} frames'.format(frames))
 
 vfvsb = VeryFastVeryStableBuffer(images)
-pc = PreciseClock(interval)
+pc = DeadlineScheduler(interval * 1000000)
 
 for _ in range(5):
     vfvsb.auto_append()
@@ -115,8 +116,7 @@ time_recording = []
 
 pc.start()
 while n < frames:
-    if pc.count() < n:
-        continue
+    pc.wait(n)
 
     if n % 5 == 0:
         pairs = vfvsb.pop()
@@ -141,6 +141,7 @@ while n < frames:
 
 
 cv2.waitKey(1)
+print(pc.report())
 
 # %% ---- 2023-07-10 ------------------------
 # Pending
@@ -20,19 +20,61 @@ Functions:
 # Requirements and constants
 
 from util.constant import *
-from util.toolbox import pop, linear_interpolate
-from util.image_loader import read_local_images, read_from_file_list
+from util.compose import Compositor
+from util.presenter import make_presenter
+from util.frame_buffer import VeryFastVeryStableBuffer, PresenterCrossfade
+from util.session_cache import compile_session, SessionCache
+from util.display_loop import DisplayLoop, flip_block_rect
+from util.recording import RecordingSink, convert_session_log
+from util.timing import MonotonicClock, latency_breakdown
+from util.scheduler import DeadlineScheduler
+from util.image_loader import MyImage, list_local_images, image_size_from_rect
+from util.image_stack import read_stack_from_file_list
+from util.image_stream import StreamingImageLoader
+from util.image_cache import DecodedImageCache
 
 from util.parallel.parallel import Parallel
 
 
 # %%
 parallel_port = 'CEFC'
+
+# The backend of the parallel port,
+# 'auto' refers the driver of the platform,
+# 'simulated' refers the in-memory port for the machine without the parallel port.
+parallel_backend = 'auto'
 key_frame_interval = 100
 m_value_interpolate_between_key_frames = 5
 
-fps_timer = fpstimer.FPSTimer(
-    1000 / key_frame_interval * m_value_interpolate_between_key_frames)
+# The backend of the crossfade frames synthesis,
+# 'thread' refers the producer thread in the same process,
+# 'process' refers the worker processes writing into the shared memory.
+synthesis_backend = 'thread'
+synthesis_workers = 2
+
+session_cache_options = dict(
+    # Toggle if compile every frame of the session into the disk before it starts,
+    # the compiled session is reused if nothing changes.
+    compile_session_flag=False,
+
+    # The path of the compiled session
+    path=Path('session-cache/session.npy'),
+)
+
+# The interval of the frames in nanoseconds
+frame_interval_ns = key_frame_interval * \
+    1000000 // m_value_interpolate_between_key_frames
+
+scheduler_options = dict(
+    # The frames are displayed at the absolute deadlines from the session start,
+    # the waiting sleeps until the spin_margin_ns before the deadline and spins for the rest.
+    spin_margin_ns=2000000,
+
+    # The policy of the late frames,
+    # 'catch_up' displays the late frames without waiting until the schedule is caught up,
+    # 'skip' drops the frames whose next deadline is passed.
+    policy='catch_up',
+)
 
 read_images_options = dict(
     # Toggle if read images from configuration file,
@@ -41,6 +83,33 @@ read_images_options = dict(
 
     # Toggle if read images from image folder
     read_from_local_folder_flag=True,  # False,
+
+    # The number of the decoding threads,
+    # and the max number of the files being decoded at the same time.
+    workers=8,
+    max_in_flight=32,
+
+    # Toggle if use the decoded image cache across runs,
+    # the cache is bounded by the max_bytes.
+    image_cache_flag=True,
+    image_cache_folder=Path('image-cache'),
+    image_cache_max_bytes=4 * 1024**3,
+
+    # Toggle if stream the images just ahead of the display,
+    # instead of loading all of them into the memory,
+    # the memory is bounded by the look_ahead images.
+    streaming_flag=False,
+    look_ahead=16,
+)
+
+image_size_options = dict(
+    # The images are resized to the image rect of the full screen window,
+    # bounded by the max_size of (width, height).
+    max_size=(800, 800),
+
+    # The resize mode, 'stretch' ignores the aspect,
+    # 'fit' keeps the aspect with the border, 'fill' keeps the aspect with the crop.
+    resize_mode='fit',
 )
 
 file_list_file_input = Path('src/example.csv')
@@ -48,7 +117,8 @@ file_list_file_input = Path('src/example.csv')
 images_local_folder_input = Path(
     os.environ.get('OneDriveConsumer', '/'), 'Pictures', 'DesktopPictures')
 
-assert any([e for e in read_images_options.values()]
+assert any([read_images_options['read_from_file_list_flag'],
+            read_images_options['read_from_local_folder_flag']]
            ), 'At least choose one image reading method'
 
 display_options = dict(
@@ -57,6 +127,23 @@ display_options = dict(
 
     # Toggle for the (current | total) OSD on the upper-left corner
     counting_flag=True,
+
+    # The presenter of the frames,
+    # 'cv2' refers the cv2.imshow window without the vsync,
+    # 'gl' refers the OpenGL window swapping on the vsync, it requires moderngl and glfw,
+    # 'null' refers no display, for the benchmarking without the screen.
+    presenter='cv2',
+
+    # The options of the presenter,
+    # the 'gl' presenter accepts vsync=True and headless=False,
+    # the 'null' presenter accepts size=(800, 600), checksum_flag=True and dump_folder=None.
+    presenter_options=dict(),
+
+    # The crossfade mode,
+    # 'buffer' refers the buffer builds every interpolated frame on the CPU,
+    # 'presenter' refers the buffer builds the key frames only, and the presenter blends them at display time,
+    # the counting OSD is not drawn in the 'presenter' mode.
+    crossfade_mode='buffer',
 )
 
 quite_key_code = 'q'
@@ -70,6 +157,16 @@ put_text_kwargs = dict(
     lineType=cv2.LINE_AA
 )
 
+recording_options = dict(
+    # The records are written into the preallocated ring of the capacity,
+    # and streamed into the session log of the path by the background writer every flush_interval seconds,
+    # so the records are kept if the session crashes,
+    # and the session log of the previous run is moved aside with its modified time in the name.
+    path=Path('time_recording.bin'),
+    capacity=4096,
+    flush_interval=0.5,
+)
+
 parallel_tag = dict(
     rsvp_session_start=16,
     rsvp_session_stop=32,
@@ -78,8 +175,19 @@ parallel_tag = dict(
     keypress_event=8,
 )
 
-parallel = Parallel()
-parallel.reset(parallel_port)
+trigger_options = dict(
+    # The mode of the image display codes,
+    # 'queue' refers the codes are queued to the dispatcher thread after the frame is displayed,
+    # 'present' refers the code is written inline right after the presenter reports the frame is presented.
+    mode='queue',
+
+    # The calibrated offset from the presented time to the writing in the 'present' mode
+    offset_ns=0,
+
+    # The width of the pulse and the min gap between the pulses in seconds
+    pulse_width=0.001,
+    min_gap=0.001,
+)
 
 # %% ---- 2023-07-10 ------------------------
 # Function and class
@@ -92,24 +200,33 @@ class DynamicOptions(object):
 
     def __init__(self):
         self.winname = CONFIG.project.name
+        self.clock = MonotonicClock()
         pass
 
     def start(self):
         """Start the options
 
         - Set the rsvp_loop_flag,
-        - Init the recording with the empty list.
+        - Start the recording sink.
         """
         self.rsvp_loop_flag = True
-        self.recording = []
+        self.recording = RecordingSink(**recording_options)
+        self.recording.start(meta=dict(
+            clock_offset_ns=self.clock.offset_ns,
+            frame_interval_ns=frame_interval_ns,
+            trigger_mode=trigger_options['mode'],
+            trigger_offset_ns=trigger_options['offset_ns']))
 
-    def record(self, dct):
-        """Record the dct in a separate threading.
+    def record(self, event, t, **kwargs):
+        """Record the event into the recording sink,
+        it costs one row write without creating any thread.
 
         Args:
-            dct (dict): The dict to be recorded.
+            event (str): The name of the event, 'displayImage', 'keyPress' or 'skippedKeyFrame'.
+            t (float): The time of the event.
+            kwargs: The frame_idx, img_id and code, refers RecordingSink.record().
         """
-        threading.Thread(target=self.recording.append, args=(dct, )).start()
+        self.recording.record(event, t, **kwargs)
 
     def stop(self):
         """Stop the options
@@ -122,8 +239,8 @@ class DynamicOptions(object):
         if path.is_file():
             LOGGER.warning('Saving recording to existing file {}'.format(path))
 
-        table = pd.DataFrame(DY_OPT.recording)
-        table.to_csv(path)
+        self.recording.stop()
+        table = convert_session_log(self.recording.path, path)
 
         LOGGER.debug('Saved recording to {}'.format(path))
         return table
@@ -138,291 +255,282 @@ def keypress_callback(key):
     Args:
         key (key): The key being pressed.
     """
-    t = time.time()
+    t = DY_OPT.clock.now()
     parallel.send(parallel_tag['keypress_event'])
 
     if key.name == quite_key_code:
         DY_OPT.stop()
 
-    DY_OPT.record(dict(
-        time=t,
-        code=key,
-        recordEvent='keyPress'
-    ))
+    DY_OPT.record('keyPress', t, code=key.name)
     return
 
 
-def uint8(x):
-    """Convert ndarray x to uint8 format
+def display_code(img_id):
+    """The trigger code of the displayed key frame.
 
     Args:
-        x (numpy.Array): ndarray.
+        img_id (str): The img_id of the key frame.
 
     Returns:
-        numpy.Array: The ndarray in uint8 format.
+        int: The code, the target image refers target_image_display, the others refer other_image_display.
     """
-    return x.astype(np.uint8)
-
+    if img_id.startswith('target'):
+        return parallel_tag['target_image_display']
+    return parallel_tag['other_image_display']
 
-class VeryFastVeryStableBuffer(object):
-    def __init__(self, images, m=5):
-        self.images = images
-        self.m = m
-        self.buffer = []
-        self.size = 0
-
-    def clear_buffer(self):
-        [self.pop() for _ in range(self.size)]
-        self.size = 0
-        return
 
-    def pop(self):
-        mats = [self.buffer.pop(0) for _ in range(self.m)]
-        self.size -= 1
-
-        threading.Thread(target=self.auto_append, daemon=True).start()
-
-        return mats
-
-    def auto_append(self):
-        image = pop(self.images)
-        mat1 = image.get('bgr')
-        id = image.get('img_id')
-        mat2 = pop(self.images, shift_flag=False).get('bgr')
-
-        for e in linear_interpolate(mat1, mat2, self.m):
-            self.buffer.append((id, uint8(e)))
-            # Only attach the id to the first element
-            id = None
-
-        self.size += 1
-
-        return self.size
-
-    def loop(self):
-        threading.Thread(target=self._loop, args=(), daemon=True).start()
-        return
+class CV2FullScreen(object):
+    """The full screen display,
+    the frames are presented by the pluggable presenter, refers util.presenter.
+    """
 
-    def _loop(self, sleep_interval=20):
-        secs = sleep_interval / 1000
-        while True:
-            if self.size < 10:
-                self.auto_append()
+    def __init__(self, winname=DY_OPT.winname, presenter=None):
+        """Init the full screen display.
 
-            time.sleep(secs)
-            print('Loop', self.size, len(self.buffer))
+        Args:
+            winname (str, optional): The name of the window. Defaults to DY_OPT.winname.
+            presenter (Presenter, optional): The presenter. Defaults to None, refers the presenter of display_options.
+        """
+        self.winname = winname
+        self.compositor = None
 
+        if presenter is None:
+            presenter = make_presenter(
+                display_options['presenter'], winname, **display_options['presenter_options'])
+        self.presenter = presenter
 
-class CV2FullScreen(object):
-    def __init__(self, winname=DY_OPT.winname):
-        self.winname = winname
         self.setup_full_screen()
         pass
 
-    def setup_full_screen(self):
-        """Setup the cv2 for full screen display
-        """
-        # Set the cv2 window to full-screen-display.
-        # Set the window to full-screen.
-        cv2.namedWindow(self.winname, cv2.WND_PROP_FULLSCREEN)
-        # Set the window property to fit the full-screen, disable the top bar and something like that.
-        cv2.setWindowProperty(self.winname,
-                              cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
-        # The window_position is (x, y, width, height)
-        image_rect = cv2.getWindowImageRect(DY_OPT.winname)
-        self.image_rect = image_rect
-
-        self.generate_background()
-
-        LOGGER.debug('Setup cv2 window {} with full screen, the image rect is {}'.format(
-            self.winname, self.image_rect))
-
-        return
-
-    def generate_background(self, image_rect=None, r=100, g=100, b=100):
-        """Generate the background for the display.
+    def make_compositor(self, image_shape, r=100, g=100, b=100):
+        """Make the compositor rendering the images at the screen resolution.
 
         Args:
-            image_rect (4 elements tuple, optional): The rect for the image in the format of (x, y, width, height). Defaults to None, refers using self.image_rect.
-            r (int, optional): R channel. Defaults to 100.
-            g (int, optional): G channel. Defaults to 100.
-            b (int, optional): B channel. Defaults to 100.
+            image_shape (tuple): The shape of the image, (height, width, 3).
+            r (int, optional): R channel of the letterbox border. Defaults to 100.
+            g (int, optional): G channel of the letterbox border. Defaults to 100.
+            b (int, optional): B channel of the letterbox border. Defaults to 100.
 
         Returns:
-            3d array: The BGR background image in the format of (height, width, 3)
+            Compositor: The compositor.
         """
-        if image_rect is None:
-            image_rect = self.image_rect
-
-        background = np.zeros((image_rect[3], image_rect[2], 3))
-        background[:, :, 0] = b
-        background[:, :, 1] = g
-        background[:, :, 2] = r
-        background = uint8(background)
+        self.compositor = Compositor(
+            self.image_rect[2:], image_shape, bgr=(b, g, r))
+        return self.compositor
 
-        LOGGER.debug(
-            'Generated background image ({})'.format(background.shape))
+    def setup_full_screen(self):
+        """Setup the presenter for full screen display
+        """
+        # The image_rect is (x, y, width, height)
+        self.image_rect = self.presenter.open()
 
-        self.background = background
+        LOGGER.debug('Setup {} presenter {} with full screen, the image rect is {}'.format(
+            self.presenter.name, self.winname, self.image_rect))
 
-        return background
+        return
 
-    def place_in_center(self, bgr, background=None):
-        """Place the bgr into the center of the background image.
+    def present(self, frame):
+        """Present the full screen frame.
 
         Args:
-            bgr (3d array): The image in BGR format, the size is (height, width, 3).
-            background (3d array, optional): The larger background as the same format as the bgr. Defaults to None, refers using self.background.
+            frame (np.Array): The BGR uint8 frame in the size of the image_rect.
 
         Returns:
-            3d array: The new background with the bgr in the center of it.
+            int: The perf_counter_ns when the frame is presented.
         """
+        return self.presenter.present(frame)
 
-        if background is None:
-            background = self.background
+    def push_key(self, frame):
+        """Push the key frame of the crossfade, refers Presenter.push_key()."""
+        self.presenter.push_key(frame)
 
-        bg_height, bg_width = background.shape[:2]
-        img_height, img_width = bgr.shape[:2]
+    def present_blend(self, alpha, marker=None):
+        """Present the crossfade of the key frames, refers Presenter.present_blend()."""
+        return self.presenter.present_blend(alpha, marker)
 
-        x_offset = (bg_width - img_width) // 2
-        y_offset = (bg_height - img_height) // 2
+    def poll_key(self):
+        """Poll the key events without waiting, refers Presenter.poll_key()."""
+        return self.presenter.poll_key()
 
-        background[y_offset:y_offset+img_height,
-                   x_offset:x_offset+img_width] = bgr
+    def wait_key(self, delay=0):
+        """Wait for the key press, refers Presenter.wait_key()."""
+        return self.presenter.wait_key(delay)
 
-        return background
+    def close(self):
+        """Close the presenter."""
+        self.presenter.close()
 
 
 # %% ---- 2023-07-10 ------------------------
 # Play ground
 
-# ---------------------------------------------------------------------
-# Read images from local folder
-# All the images are tagged as 'nothing'.
-if read_images_options['read_from_local_folder_flag']:
-    file_list, images, tag_table = read_local_images(images_local_folder_input)
-    LOGGER.debug('Loaded {} | {} images from folder {}'.format(
-        len(images), len(file_list), images_local_folder_input))
-
-# ---------------------------------------------------------------------
-# Read images from file_list_input
-if read_images_options['read_from_file_list_flag']:
-    file_list = pd.read_csv(file_list_file_input, index_col=0).values.tolist()
-    images, tag_table = read_from_file_list(file_list)
-    LOGGER.debug('Loaded {} | {} images from file {}'.format(
-        len(images), len(file_list), file_list_file_input))
-
-
-# %% ---- 2023-07-10 ------------------------
-# Pending
-frames = len(file_list * m_value_interpolate_between_key_frames)
-LOGGER.debug('Display with {} frames'.format(frames))
-
-vfvsb = VeryFastVeryStableBuffer(
-    images, m=m_value_interpolate_between_key_frames)
-cv2_full_screen = CV2FullScreen(DY_OPT.winname)
-
-
-# Pre install the vfvsb with 5 image pairs.
-for _ in range(5):
-    vfvsb.auto_append()
-
-# Fetch one image pair from the vfvsb.
-pairs = vfvsb.pop()
-
-for _ in range(vfvsb.m):
-    id, bgr = pairs.pop(0)
-    cv2.putText(bgr, 'Press any key to start...', **put_text_kwargs)
-    cv2.imshow(DY_OPT.winname, cv2_full_screen.place_in_center(bgr))
-    cv2.waitKey(100)
-
-print('Press any key to continue')
-cv2.waitKey()
-print('Start...')
-
-# %%
-# Start the RSVP session
-
-DY_OPT.start()
-frame_idx = 0
-time_recording = []
-
-# ! Make sure suppress the key,
-# ! to avoid it affects the timing.
-keyboard.on_press(keypress_callback, suppress=True)
-
-parallel.send(parallel_tag['rsvp_session_start'])
-fps_timer.sleep()
-while (frame_idx < frames) and DY_OPT.rsvp_loop_flag:
-
-    key_frame_flag = frame_idx % m_value_interpolate_between_key_frames == 0
-
-    if key_frame_flag:
-        pairs = vfvsb.pop()
-
-    id, bgr = pairs.pop(0)
-
-    # Draw the flip block in the left-bottom corner,
-    # - m_value_interpolate_between_key_frames > 1 refers linear interpolating with the value, it is white when key frame is displayed;
-    # - m_value_interpolate_between_key_frames == 1 refers no interpolating, it flips between white and black in frames.
-    if display_options['flip_block_flag']:
-        if m_value_interpolate_between_key_frames > 1:
-            if key_frame_flag:
-                bgr[-100:, :100] = 255
-            else:
-                bgr[-100:, :100] = 0
-        else:
-            if frame_idx % 2 == 0:
-                bgr[-100:, :100] = 255
-            else:
-                bgr[-100:, :100] = 0
-
-    # Draw the counting notion in the left-top corner
-    if display_options['counting_flag']:
-        cv2.putText(bgr, '{} | {}'.format(
-            frame_idx, frames), **put_text_kwargs)
-
-    t = time.time()
-    cv2.imshow(DY_OPT.winname, cv2_full_screen.place_in_center(bgr))
-    cv2.pollKey()
-
-    # Send displaying code for target image (2), and other image (1)
-    # The sending only operates on the first frame of the interpolating
-    if key_frame_flag:
-        if id.startswith('target'):
-            parallel.send(parallel_tag['target_image_display'])
-        else:
-            parallel.send(parallel_tag['other_image_display'])
-
-    time_recording.append((frame_idx, id, t))
-    DY_OPT.record(dict(
-        time=t,
-        imgId=id,
-        frameIdx=frame_idx,
-        recordEvent='displayImage'
-    ))
-    print('Display {: 4d} at {:.4f} for {}'.format(
-        frame_idx, time_recording[-1][-1], id))
-
-    frame_idx += 1
-
-    fps_timer.sleep()
-
-# The RSVP session stops
-parallel.send(parallel_tag['rsvp_session_stop'])
-
-# Recover the keyboard hook
-keyboard.unhook_all()
-
-cv2.waitKey(1)
-DY_OPT.stop()
-
-print(DY_OPT.save_recording('time_recording.csv'))
-
-
-# %% ---- 2023-07-10 ------------------------
-# Pending
-# Call the check_time_recording function.
-os.system('python check_time_recording.py')
-
-# %%
+# The script body only runs in the main process,
+# the spawned synthesis workers import this module without running it.
+if __name__ == '__main__':
+    parallel = Parallel(pulse_width=trigger_options['pulse_width'],
+                        min_gap=trigger_options['min_gap'])
+    parallel.reset(parallel_port, backend=parallel_backend)
+
+    scheduler = DeadlineScheduler(frame_interval_ns, **scheduler_options)
+
+    image_cache = DecodedImageCache(
+        read_images_options['image_cache_folder'],
+        max_bytes=read_images_options['image_cache_max_bytes']
+    ) if read_images_options['image_cache_flag'] else None
+
+    # ---------------------------------------------------------------------
+    # List images from local folder
+    # All the images are tagged as 'nothing'.
+    if read_images_options['read_from_local_folder_flag']:
+        file_list = list_local_images(images_local_folder_input)
+        LOGGER.debug('Found {} images from folder {}'.format(
+            len(file_list), images_local_folder_input))
+
+    # ---------------------------------------------------------------------
+    # List images from file_list_input
+    if read_images_options['read_from_file_list_flag']:
+        file_list = pd.read_csv(file_list_file_input, index_col=0).values.tolist()
+        LOGGER.debug('Found {} images from file {}'.format(
+            len(file_list), file_list_file_input))
+
+    # ---------------------------------------------------------------------
+    # Setup the full screen window,
+    # the images are resized to its image rect when they are decoded.
+    cv2_full_screen = CV2FullScreen(DY_OPT.winname)
+    MyImage.image_size = image_size_from_rect(
+        cv2_full_screen.image_rect, image_size_options['max_size'])
+    MyImage.resize_mode = image_size_options['resize_mode']
+    LOGGER.debug('Resize images to {} in {} mode'.format(
+        MyImage.image_size, MyImage.resize_mode))
+
+    # ---------------------------------------------------------------------
+    # Read or stream the images in the file_list
+    if read_images_options['streaming_flag']:
+        images = StreamingImageLoader(
+            file_list,
+            window=read_images_options['look_ahead'],
+            workers=read_images_options['workers'],
+            cache=image_cache)
+        tag_table = images.tag_table
+    else:
+        images = read_stack_from_file_list(
+            file_list,
+            workers=read_images_options['workers'],
+            max_in_flight=read_images_options['max_in_flight'],
+            cache=image_cache)
+        tag_table = images.tag_table
+        LOGGER.debug('Loaded {} | {} images'.format(len(images), len(file_list)))
+
+    # %% ---- 2023-07-10 ------------------------
+    # Pending
+    frames = len(file_list * m_value_interpolate_between_key_frames)
+
+    # The buffer builds the key frames only if the presenter crossfades them
+    presenter_crossfade_flag = display_options['crossfade_mode'] == 'presenter'
+    buffer_m = 1 if presenter_crossfade_flag else m_value_interpolate_between_key_frames
+    LOGGER.debug('Display with {} frames'.format(frames))
+
+    # The frames are composed at the screen resolution once,
+    # the display loop shows them without copying.
+    compositor = cv2_full_screen.make_compositor(images.shape)
+
+    # The flip block in the left-bottom corner of the image area,
+    # it is (x, y, width, height) in the full-screen frame.
+    flip_rect = flip_block_rect(compositor)
+
+    # The flip block is baked into the compiled session,
+    # except the presenter crossfade, it draws the flip block as the marker.
+    flip_baked_flag = False
+
+    if session_cache_options['compile_session_flag']:
+        assert not read_images_options['streaming_flag'], 'The compiled session requires all the images'
+
+        flip_baked_flag = display_options['flip_block_flag'] and not presenter_crossfade_flag
+
+        # The extra key frame is for the 'Press any key' frames,
+        # and the presenter crossfade needs one more for the last key frame
+        compile_session(images, buffer_m,
+                        len(file_list) + 1 + presenter_crossfade_flag, session_cache_options['path'],
+                        compositor=compositor, flip_rect=flip_rect if flip_baked_flag else None)
+        vfvsb = SessionCache(session_cache_options['path'])
+    else:
+        vfvsb = VeryFastVeryStableBuffer(
+            images, m=buffer_m,
+            backend=synthesis_backend, workers=synthesis_workers,
+            compositor=compositor)
+
+    # Start the producer, it fills the vfvsb to the high water.
+    vfvsb.start()
+
+    # Fetch one image pair from the vfvsb.
+    id, mats = vfvsb.pop()
+
+    for frame in mats:
+        cv2.putText(compositor.inner(frame),
+                    'Press any key to start...', **put_text_kwargs)
+        cv2_full_screen.present(frame)
+        cv2_full_screen.wait_key(100)
+
+    print('Press any key to continue')
+    cv2_full_screen.wait_key()
+    print('Start...')
+
+    if presenter_crossfade_flag:
+        vfvsb = PresenterCrossfade(vfvsb, cv2_full_screen)
+
+    # %%
+    # Start the RSVP session
+
+    DY_OPT.start()
+
+    # ! Make sure suppress the key,
+    # ! to avoid it affects the timing.
+    keyboard.on_press(keypress_callback, suppress=True)
+
+    parallel.send(parallel_tag['rsvp_session_start'])
+
+    # The display loop, it is shared with the benchmark_pipeline.py
+    display_loop = DisplayLoop(
+        cv2_full_screen, vfvsb, scheduler, parallel, DY_OPT.clock, DY_OPT.record, display_code,
+        frames, m_value_interpolate_between_key_frames, compositor,
+        flip_rect=flip_rect,
+        flip_block_flag=display_options['flip_block_flag'],
+        flip_baked_flag=flip_baked_flag,
+        counting_flag=display_options['counting_flag'],
+        put_text_kwargs=put_text_kwargs,
+        presenter_crossfade_flag=presenter_crossfade_flag,
+        trigger_mode=trigger_options['mode'],
+        trigger_offset_ns=trigger_options['offset_ns'])
+
+    display_loop.run(lambda: DY_OPT.rsvp_loop_flag)
+
+    # The RSVP session stops
+    parallel.send(parallel_tag['rsvp_session_stop'])
+
+    vfvsb.stop()
+    LOGGER.debug('Buffer report: {}'.format(vfvsb.report()))
+    LOGGER.debug('Scheduler report: {}'.format(scheduler.report()))
+    LOGGER.debug('Presenter report: {}'.format(cv2_full_screen.presenter.report()))
+
+    # Recover the keyboard hook
+    keyboard.unhook_all()
+
+    # The queued codes are sent before the dispatcher stops
+    parallel.close()
+    LOGGER.debug('Parallel report: {}'.format(parallel.report()))
+
+    cv2_full_screen.wait_key(1)
+    cv2_full_screen.close()
+    DY_OPT.stop()
+
+    print(DY_OPT.save_recording('time_recording.csv'))
+    LOGGER.debug('Latency breakdown (ms):\n{}'.format(
+        latency_breakdown(DY_OPT.recording.to_records()).describe()))
+
+    # %% ---- 2023-07-10 ------------------------
+    # Pending
+    # Call the check_time_recording function,
+    # it prints the summary and plots the figures.
+    os.system('python check_time_recording.py --plot')
+
+    # %%
@@ -0,0 +1,95 @@
+"""
+File: test_crossfade.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the fixed-point CrossfadeEngine against the float toolbox.linear_interpolate,
+    the pixels are the same within 1 LSB and the key frames are exact.
+
+    python -m pytest tests
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import numpy as np
+import pytest
+
+from util.crossfade import CrossfadeEngine
+from util.toolbox import linear_interpolate
+
+# The shape of the key frames
+SHAPE = (48, 64, 3)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def random_frames(seed):
+    rng = np.random.default_rng(seed)
+    return (rng.integers(0, 256, SHAPE, dtype=np.uint8),
+            rng.integers(0, 256, SHAPE, dtype=np.uint8))
+
+
+@pytest.mark.parametrize('m', [1, 2, 3, 5, 7, 10, 16])
+def test_blend_matches_float_path(m):
+    arr1, arr2 = random_frames(m)
+    out = CrossfadeEngine(SHAPE, m=m).blend(arr1, arr2)
+
+    # The float path is converted into uint8 as the player displays it
+    expect = np.array(linear_interpolate(arr1, arr2, m)).astype(np.uint8)
+
+    assert out.dtype == np.uint8
+    assert out.shape == (m, ) + SHAPE
+    assert np.abs(out.astype(np.int16) - expect).max() <= 1
+
+
+@pytest.mark.parametrize('m', [2, 3, 5, 10])
+def test_blend_endpoints_are_exact(m):
+    arr1, arr2 = random_frames(100 + m)
+    engine = CrossfadeEngine(SHAPE, m=m)
+
+    # The first frame is the key frame itself
+    out = engine.blend(arr1, arr2)
+    np.testing.assert_array_equal(out[0], arr1)
+
+    # The crossfade of the same frames is the frame
+    for frame in engine.blend(arr2, arr2):
+        np.testing.assert_array_equal(frame, arr2)
+
+    # The full range keeps in the range
+    black, white = np.zeros(SHAPE, np.uint8), np.full(SHAPE, 255, np.uint8)
+    out = engine.blend(black, white)
+    assert out[0].max() == 0
+    assert np.diff(out[:, 0, 0, 0].astype(np.int16)).min() >= 0
+
+
+def test_blend_into_preallocated_out():
+    arr1, arr2 = random_frames(0)
+    engine = CrossfadeEngine(SHAPE, m=5)
+    out = engine.allocate()
+
+    assert engine.blend(arr1, arr2, out=out) is out
+    np.testing.assert_array_equal(out, engine.blend(arr1, arr2))
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
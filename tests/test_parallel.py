@@ -0,0 +1,145 @@
+"""
+File: test_parallel.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the Parallel dispatcher on the simulated port,
+    the codes are sent in the FIFO order, every code is one pulse,
+    and the pulses keep the pulse_width and the min_gap.
+
+    python -m pytest tests
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import threading
+import numpy as np
+
+from util.parallel.parallel import Parallel
+
+# The pulse width and the min gap in seconds
+PULSE_WIDTH = 0.001
+MIN_GAP = 0.002
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def make_parallel():
+    parallel = Parallel(pulse_width=PULSE_WIDTH, min_gap=MIN_GAP)
+    parallel.reset('0', backend='simulated')
+    return parallel
+
+
+def pulses(port):
+    """The (code, rise_ns, fall_ns) of the pulses on the port,
+    the first edge is the zero written by the reset().
+    """
+    times, values = port.edges()
+    assert values[0] == 0
+    times, values = times[1:], values[1:]
+
+    # Every pulse is the rising edge of the code and the falling edge of the zero
+    assert len(values) % 2 == 0
+    assert (values[1::2] == 0).all()
+    assert (values[0::2] != 0).all()
+
+    return values[0::2], times[0::2], times[1::2]
+
+
+def check_timing(rise_ns, fall_ns):
+    assert (fall_ns - rise_ns).min() >= PULSE_WIDTH * 1e9
+    assert (rise_ns[1:] - fall_ns[:-1]).min() >= MIN_GAP * 1e9
+
+
+def test_burst_is_sent_in_order():
+    parallel = make_parallel()
+    codes = [1, 2, 4, 8, 16, 32, 64, 128, 3, 5]
+
+    for code in codes:
+        parallel.send(code, verbose=False)
+    parallel.close(timeout=5)
+
+    sent, rise_ns, fall_ns = pulses(parallel.port)
+
+    # None of the codes is merged or dropped
+    assert sent.tolist() == codes
+    check_timing(rise_ns, fall_ns)
+
+    edges = parallel.sent_edges()
+    assert edges['code'].tolist() == codes
+    assert (edges['rise_ns'] >= edges['enqueue_ns']).all()
+    assert parallel.report()['sent'] == len(codes)
+
+
+def test_zero_is_not_sent():
+    parallel = make_parallel()
+    parallel.send(0, verbose=False)
+    parallel.send(7, verbose=False)
+    parallel.close(timeout=5)
+
+    sent, _, _ = pulses(parallel.port)
+    assert sent.tolist() == [7]
+
+
+def test_send_inline_keeps_the_pulses_apart():
+    parallel = make_parallel()
+
+    # The inline codes are mixed with the queued burst from another thread
+    def burst():
+        for code in [1, 2, 4, 8, 16]:
+            parallel.send(code, verbose=False)
+
+    thread = threading.Thread(target=burst)
+    thread.start()
+    rise_ns = [parallel.send_inline(code) for code in [32, 64, 128]]
+    thread.join()
+    parallel.close(timeout=5)
+
+    sent, port_rise_ns, port_fall_ns = pulses(parallel.port)
+
+    # Every code is one pulse, the queued codes keep their order
+    assert sorted(sent.tolist()) == [1, 2, 4, 8, 16, 32, 64, 128]
+    assert [c for c in sent.tolist() if c < 32] == [1, 2, 4, 8, 16]
+    assert [c for c in sent.tolist() if c >= 32] == [32, 64, 128]
+    check_timing(port_rise_ns, port_fall_ns)
+
+    # The returned time is right after the rising edge of the port
+    inline = np.isin(sent, [32, 64, 128])
+    assert (np.array(rise_ns) >= port_rise_ns[inline]).all()
+
+
+def test_send_inline_at_the_deadline():
+    parallel = make_parallel()
+
+    at_ns = parallel.port.edges()[0][-1] + int(0.01 * 1e9)
+    rise_ns = parallel.send_inline(9, at_ns)
+    parallel.close(timeout=5)
+
+    sent, port_rise_ns, _ = pulses(parallel.port)
+    assert sent.tolist() == [9]
+    assert port_rise_ns[0] >= at_ns
+    assert rise_ns >= port_rise_ns[0]
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,132 @@
+"""
+File: test_parallel_linux.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the PParallelLinux against the fake pyparallel port,
+    the shadow data register, the masked writes and the status reading.
+
+    python -m pytest tests
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+from util.parallel._linux import PParallelLinux
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class FakePPDev:
+    """The fake of the pyparallel port on the ppdev device node,
+    it keeps the registers in the memory and counts the ioctls.
+    """
+
+    def __init__(self, data=0, status=0):
+        self.data = data
+        self.status = status
+        self.ioctls = 0
+
+    def setData(self, data):
+        self.ioctls += 1
+        self.data = data
+
+    def PPRDATA(self):
+        self.ioctls += 1
+        return self.data
+
+    def PPRSTATUS(self):
+        self.ioctls += 1
+        return self.status
+
+
+def make_port(data=0, status=0):
+    dev = FakePPDev(data=data, status=status)
+    return PParallelLinux(port=dev), dev
+
+
+def test_shadow_is_read_once():
+    p, dev = make_port(data=0b101)
+    assert dev.ioctls == 1
+    assert p.readData() == 0b101
+
+    # The data pins are read from the shadow
+    assert [p.readPin(pin) for pin in range(2, 10)] == [1, 0, 1, 0, 0, 0, 0, 0]
+    assert dev.ioctls == 1
+
+
+def test_set_pins_is_one_write():
+    p, dev = make_port(data=0b11110000)
+
+    p.setPins(0b00111100, 0b00000100)
+    assert dev.data == 0b11000100
+    assert p.readData() == dev.data
+    assert dev.ioctls == 2
+
+
+def test_set_pins_mask_takes_precedence():
+    p, dev = make_port(data=0b00000000)
+
+    # The bits of the value out of the mask are ignored
+    p.setPins(0b00000011, 0b11111110)
+    assert dev.data == 0b00000010
+
+    # The value is clipped to the data register
+    p.setPins(0x1FF, 0x1FF)
+    assert dev.data == 0xFF
+
+
+def test_set_pin_keeps_the_others():
+    p, dev = make_port(data=0b00000001)
+
+    p.setPin(9, 1)
+    assert dev.data == 0b10000001
+    p.setPin(2, 0)
+    assert dev.data == 0b10000000
+    assert dev.ioctls == 3
+
+
+def test_read_data_refresh():
+    p, dev = make_port(data=1)
+    dev.data = 7
+    assert p.readData() == 1
+    assert p.readData(refresh=True) == 7
+    assert p.readPin(4) == 1
+
+
+def test_read_status_inverts_busy():
+    p, dev = make_port(status=0)
+    assert p.readStatus() == {10: 0, 11: 1, 12: 0, 13: 0, 15: 0}
+
+    dev.status = 0x80 | 0x40 | 0x08
+    ioctls = dev.ioctls
+    assert p.readStatus() == {10: 1, 11: 0, 12: 0, 13: 0, 15: 1}
+    assert dev.ioctls == ioctls + 1
+
+    dev.status = 0x20 | 0x10
+    assert p.readPin(12) == 1
+    assert p.readPin(13) == 1
+    assert p.readPin(11) == 1
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,115 @@
+"""
+File: test_presenter.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the GLPresenter in the headless mode against the NullPresenter,
+    the presented frame and the crossfade are read back from the framebuffer.
+
+    python -m pytest tests
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import numpy as np
+import pytest
+
+from util.presenter import GLPresenter, NullPresenter
+
+# The GL presenter requires the moderngl
+pytest.importorskip('moderngl')
+
+# The (width, height) of the surface
+SIZE = (64, 48)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+@pytest.fixture
+def presenters():
+    gl = GLPresenter('test', headless=True, size=SIZE)
+    try:
+        gl.open()
+    except Exception as err:
+        pytest.skip('Can not create the headless GL context: {}'.format(err))
+
+    null = NullPresenter('test', size=SIZE)
+    null.open()
+
+    yield gl, null
+
+    gl.close()
+
+
+def random_frame(rng):
+    width, height = SIZE
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def max_diff(a, b):
+    return np.abs(a.astype(np.int16) - b.astype(np.int16)).max()
+
+
+def test_open_image_rect(presenters):
+    gl, null = presenters
+    assert gl.image_rect == null.image_rect == (0, 0) + SIZE
+
+
+def test_present_read_back(presenters):
+    gl, _ = presenters
+    frame = random_frame(np.random.default_rng(0))
+
+    gl.present(frame)
+    assert max_diff(gl.read(), frame) <= 1
+
+
+@pytest.mark.parametrize('alpha', [0, 0.5, 1])
+def test_present_blend_matches_null(presenters, alpha):
+    gl, null = presenters
+    rng = np.random.default_rng(1)
+    key_a, key_b = random_frame(rng), random_frame(rng)
+
+    for presenter in (gl, null):
+        presenter.push_key(key_a)
+        presenter.push_key(key_b)
+        presenter.present_blend(alpha)
+
+    assert max_diff(gl.read(), null.blended) <= 1
+
+
+def test_present_blend_marker(presenters):
+    gl, null = presenters
+    rng = np.random.default_rng(2)
+    key_a, key_b = random_frame(rng), random_frame(rng)
+    marker = (3, 5, 10, 7, 255)
+
+    for presenter in (gl, null):
+        presenter.push_key(key_a)
+        presenter.push_key(key_b)
+        presenter.present_blend(0.5, marker)
+
+    assert max_diff(gl.read(), null.blended) <= 1
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
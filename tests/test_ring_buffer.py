@@ -0,0 +1,149 @@
+"""
+File: test_ring_buffer.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Test the FrameRingBuffer of the single producer and the single consumer,
+    the over-run and under-run counting, the held slot and the blocking pop.
+
+    python -m pytest tests
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import time
+import threading
+import numpy as np
+
+from util.ring_buffer import FrameRingBuffer
+
+# The shape of the frames
+SHAPE = (4, 6, 3)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def fill(ring, ids):
+    for i, img_id in enumerate(ids):
+        frames = ring.reserve()
+        assert frames is not None
+        frames[:] = i
+        ring.commit(img_id)
+
+
+def test_overrun_and_underrun():
+    ring = FrameRingBuffer(3, 2, SHAPE)
+    fill(ring, ['a', 'b', 'c'])
+
+    # The buffer is full, the reserving is counted as the over-run
+    assert ring.is_full()
+    assert ring.reserve() is None
+    assert ring.reserve_index() is None
+    assert ring.overrun == 2
+    assert ring.size == 3
+
+    # Drain the buffer in the order of the committing
+    for i, expect in enumerate(['a', 'b', 'c']):
+        img_id, frames = ring.pop(block=False)
+        assert img_id == expect
+        assert frames.shape == (2, ) + SHAPE
+        assert (frames == i).all()
+    assert ring.underrun == 0
+
+    # The empty buffer is counted as the under-run
+    assert ring.pop(block=False) == (None, None)
+    assert ring.underrun == 1
+    assert ring.size == 0
+    assert ring.free() == 3
+
+    report = ring.report()
+    assert report['overrun'] == 2
+    assert report['underrun'] == 1
+    assert report['head'] == report['tail'] == 3
+
+
+def test_held_slot_is_released_on_next_pop():
+    ring = FrameRingBuffer(2, 1, SHAPE)
+    fill(ring, ['a', 'b'])
+
+    # The popped slot is held by the consumer, the producer can not overwrite it
+    img_id, frames = ring.pop()
+    assert img_id == 'a'
+    assert ring.size == 1
+    assert ring.free() == 0
+    assert ring.reserve() is None
+
+    # The next pop releases it
+    img_id, _ = ring.pop()
+    assert img_id == 'b'
+    assert ring.free() == 1
+
+    frames = ring.reserve()
+    frames[:] = 9
+    ring.commit('c')
+    img_id, frames = ring.pop()
+    assert img_id == 'c'
+    assert (frames == 9).all()
+
+
+def test_external_frames():
+    frames = np.zeros((2, 3) + SHAPE, dtype=np.uint8)
+    ring = FrameRingBuffer(2, 3, SHAPE, frames=frames)
+    ring.reserve()[:] = 5
+    ring.commit('a')
+    assert (frames[0] == 5).all()
+
+
+def test_blocking_pop_timeout_and_cancel():
+    ring = FrameRingBuffer(2, 1, SHAPE)
+
+    tic = time.perf_counter()
+    assert ring.pop(timeout=0.05) == (None, None)
+    assert time.perf_counter() - tic >= 0.05
+
+    cancel = threading.Event()
+    threading.Timer(0.02, cancel.set).start()
+    assert ring.pop(cancel=cancel.is_set) == (None, None)
+    assert ring.underrun == 2
+
+
+def test_blocking_pop_waits_for_the_producer():
+    ring = FrameRingBuffer(4, 1, SHAPE)
+    ids = ['k{}'.format(i) for i in range(20)]
+
+    def produce():
+        for img_id in ids:
+            while ring.reserve() is None:
+                time.sleep(0.0001)
+            ring.commit(img_id)
+
+    producer = threading.Thread(target=produce)
+    producer.start()
+    popped = [ring.pop(timeout=5)[0] for _ in ids]
+    producer.join()
+
+    assert popped == ids
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
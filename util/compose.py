@@ -0,0 +1,151 @@
+"""
+File: compose.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Letterboxed full-screen frame composition
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import numpy as np
+
+from .logger import LOGGER
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def center_slices(outer, inner):
+    """Compute the slices placing the inner length in the center of the outer length,
+    the inner is cropped in the center if it is larger.
+
+    Args:
+        outer (int): The outer length.
+        inner (int): The inner length.
+
+    Returns:
+        dst (slice): The slice of the outer;
+        src (slice): The slice of the inner.
+    """
+    offset = (outer - inner) // 2
+    if offset >= 0:
+        return slice(offset, offset + inner), slice(0, inner)
+    return slice(0, outer), slice(-offset, -offset + outer)
+
+
+class Compositor(object):
+    """The compositor renders the images straight at the screen resolution.
+
+    The letterbox border is painted only once when the frames are allocated,
+    the images are written into the center view of the frames,
+    and the image larger than the screen is cropped in the center.
+    So the display loop passes the ready frame to the imshow without any copy.
+    """
+
+    def __init__(self, screen_size, image_shape, bgr=(100, 100, 100)):
+        """Init the compositor.
+
+        Args:
+            screen_size (tuple): The (width, height) of the screen.
+            image_shape (tuple): The (height, width, 3) of the image.
+            bgr (tuple, optional): The BGR color of the letterbox border. Defaults to (100, 100, 100).
+        """
+        width, height = screen_size
+        self.frame_shape = (height, width, 3)
+        self.image_shape = tuple(image_shape)
+        self.bgr = bgr
+
+        dst_y, src_y = center_slices(height, self.image_shape[0])
+        dst_x, src_x = center_slices(width, self.image_shape[1])
+        self.dst = (dst_y, dst_x)
+        self.src = (src_y, src_x)
+
+        # The shape of the visible part of the image
+        self.shape = (dst_y.stop - dst_y.start, dst_x.stop - dst_x.start, 3)
+
+        LOGGER.debug('Compositor places {} into {}, the visible part is {}'.format(
+            self.image_shape, self.frame_shape, self.shape))
+
+    def paint_background(self, frames):
+        """Paint the letterbox border of the frames.
+
+        Args:
+            frames (np.Array): The uint8 frames, the shape is (..., height, width, 3).
+
+        Returns:
+            np.Array: The frames.
+        """
+        frames[...] = np.array(self.bgr, dtype=np.uint8)
+        return frames
+
+    def allocate(self, leading_shape=()):
+        """Allocate the frames with the letterbox border painted.
+
+        Args:
+            leading_shape (tuple, optional): The leading shape of the frames. Defaults to ().
+
+        Returns:
+            np.Array: The frames, the shape is leading_shape + (height, width, 3).
+        """
+        frames = np.empty(tuple(leading_shape) +
+                          self.frame_shape, dtype=np.uint8)
+        return self.paint_background(frames)
+
+    def inner(self, frames):
+        """The view of the image area in the frames.
+
+        Args:
+            frames (np.Array): The frames, the shape is (..., height, width, 3).
+
+        Returns:
+            np.Array: The view, the shape is (..., ) + self.shape.
+        """
+        return frames[(Ellipsis, ) + self.dst + (slice(None), )]
+
+    def source(self, images):
+        """The view of the visible part of the images.
+
+        Args:
+            images (np.Array): The images, the shape is (..., ) + image_shape.
+
+        Returns:
+            np.Array: The view, the shape is (..., ) + self.shape.
+        """
+        return images[(Ellipsis, ) + self.src + (slice(None), )]
+
+    def compose(self, image, frame):
+        """Write the image into the frame.
+
+        Args:
+            image (np.Array): The image, the shape is image_shape.
+            frame (np.Array): The frame, the shape is frame_shape.
+
+        Returns:
+            np.Array: The frame.
+        """
+        np.copyto(self.inner(frame), self.source(image))
+        return frame
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
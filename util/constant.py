@@ -23,6 +23,7 @@ import cv2
 import sys
 import time
 import ctypes
+import collections
 import logging
 import keyboard
 import fpstimer
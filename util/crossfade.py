@@ -0,0 +1,153 @@
+"""
+File: crossfade.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Allocation-free crossfade between key frames
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import numpy as np
+
+from .logger import LOGGER
+
+# The weights are in 8-bit fixed-point, 256 refers 1.0,
+# so the max of a * w1 + b * w2 is 255 * 256 = 65280, fits in uint16.
+FIXED_POINT_SHIFT = 8
+FIXED_POINT_ONE = 1 << FIXED_POINT_SHIFT
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def fixed_point_weights(m=5):
+    """Compute the fixed-point weights of the m segments.
+
+    The weights follow the toolbox.linear_interpolate,
+    the r2 are [0, 1/m, 2/m, ... (m-1)/m] and r1 = 1 - r2,
+    they are scaled by FIXED_POINT_ONE and rounded to integers.
+
+    Args:
+        m (int, optional): The segments. Defaults to 5.
+
+    Returns:
+        w1 (np.Array): The uint16 weights of arr1, the shape is (m, );
+        w2 (np.Array): The uint16 weights of arr2, the shape is (m, ).
+    """
+    w2 = np.round(np.arange(m) * FIXED_POINT_ONE / m).astype(np.uint16)
+    w1 = (FIXED_POINT_ONE - w2).astype(np.uint16)
+    return w1, w2
+
+
+class CrossfadeEngine(object):
+    """The crossfade engine blends two uint8 key frames into m frames.
+
+    It replaces the toolbox.linear_interpolate in the display pipeline,
+    the blending is in uint16 fixed-point,
+    and the outputs are written into the preallocated uint8 buffers.
+    The pixels are the same as the float version within 1 LSB.
+
+    The scratch buffers are allocated once for the shape,
+    so the blending allocates nothing in the following calls.
+    """
+
+    def __init__(self, shape, m=5):
+        """Init the engine.
+
+        Args:
+            shape (tuple): The shape of the key frame, (height, width, 3).
+            m (int, optional): The segments. Defaults to 5.
+        """
+        self.shape = tuple(shape)
+        self.m = m
+        self.w1, self.w2 = fixed_point_weights(m)
+        self._acc = np.zeros(self.shape, dtype=np.uint16)
+        self._tmp = np.zeros(self.shape, dtype=np.uint16)
+
+        LOGGER.debug('Crossfade engine for {} with m={}'.format(
+            self.shape, self.m))
+
+    def allocate(self):
+        """Allocate the uint8 output buffer for the m frames.
+
+        Returns:
+            np.Array: The output buffer, the shape is (m, height, width, 3).
+        """
+        return np.zeros((self.m, ) + self.shape, dtype=np.uint8)
+
+    def blend_one(self, arr1, arr2, i, out):
+        """Blend the i-th frame of the crossfade into the out.
+
+        Args:
+            arr1 (np.Array): The uint8 key frame, it fades out.
+            arr2 (np.Array): The uint8 key frame, it fades in.
+            i (int): The index of the frame, 0 refers arr1 itself.
+            out (np.Array): The uint8 output, it can be a view of a larger array.
+
+        Returns:
+            np.Array: The out.
+        """
+        w2 = int(self.w2[i])
+
+        # The key frame requires no blending
+        if w2 == 0:
+            np.copyto(out, arr1)
+            return out
+
+        np.multiply(arr1, int(self.w1[i]), out=self._acc, dtype=np.uint16)
+        np.multiply(arr2, w2, out=self._tmp, dtype=np.uint16)
+        np.add(self._acc, self._tmp, out=self._acc)
+        np.right_shift(self._acc, FIXED_POINT_SHIFT, out=self._acc)
+        np.copyto(out, self._acc, casting='unsafe')
+        return out
+
+    def blend(self, arr1, arr2, out=None):
+        """Blend all the m frames of the crossfade in one call.
+
+        Args:
+            arr1 (np.Array): The uint8 key frame, it fades out.
+            arr2 (np.Array): The uint8 key frame, it fades in.
+            out (np.Array, optional): The uint8 output, the shape is (m, height, width, 3). Defaults to None, refers allocating a new one.
+
+        Returns:
+            np.Array: The out.
+        """
+        if out is None:
+            out = self.allocate()
+
+        for i in range(self.m):
+            self.blend_one(arr1, arr2, i, out[i])
+
+        return out
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+if __name__ == '__main__':
+    from .toolbox import linear_interpolate
+
+    a = np.random.randint(0, 256, (800, 800, 3), dtype=np.uint8)
+    b = np.random.randint(0, 256, (800, 800, 3), dtype=np.uint8)
+
+    engine = CrossfadeEngine(a.shape, m=5)
+    out = engine.blend(a, b)
+
+    for e, f in zip(linear_interpolate(a, b, 5), out):
+        diff = np.abs(e.astype(np.uint8).astype(np.int16) - f)
+        print('Max diff is {}'.format(diff.max()))
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,235 @@
+"""
+File: display_loop.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The RSVP display loop, it is shared by the player and the headless benchmark,
+    so the benchmark measures the same loop the player runs.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import cv2
+
+from .logger import LOGGER
+from .session_cache import flip_value
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def flip_block_rect(compositor, size=100):
+    """The flip block in the left-bottom corner of the image area.
+
+    Args:
+        compositor (Compositor): The compositor of the frames.
+        size (int, optional): The size of the flip block. Defaults to 100.
+
+    Returns:
+        tuple: The (x, y, width, height) in the full-screen frame.
+    """
+    y = max(compositor.dst[0].stop - size, compositor.dst[0].start)
+    return (compositor.dst[1].start, y,
+            min(size, compositor.shape[1]), compositor.dst[0].stop - y)
+
+
+class DisplayLoop(object):
+    """The RSVP display loop.
+
+    Every frame is
+    - popped from the buffer at the key frame, the skipped key frames of the skip policy are recorded,
+    - drawn with the flip block and the counting OSD,
+    - presented at the deadline of the scheduler,
+    - triggered at the key frame, in the 'queue' or 'present' mode of the Parallel,
+    - recorded as the displayImage with its timing.
+
+    The screen is the CV2FullScreen of the player or the presenter itself,
+    it presents the frames by present(), present_blend() and poll_key().
+    """
+
+    def __init__(self, screen, buffer, scheduler, parallel, clock, record, code_of,
+                 frames, m, compositor, flip_rect=None, flip_block_flag=True, flip_baked_flag=False,
+                 counting_flag=True, put_text_kwargs=None, presenter_crossfade_flag=False,
+                 trigger_mode='queue', trigger_offset_ns=0, verbose=True):
+        """Init the loop.
+
+        Args:
+            screen (CV2FullScreen or Presenter): The screen presenting the frames.
+            buffer (VeryFastVeryStableBuffer): The buffer of the frames, or the PresenterCrossfade in the presenter crossfade mode.
+            scheduler (DeadlineScheduler): The scheduler of the frames.
+            parallel (Parallel): The trigger dispatcher.
+            clock (MonotonicClock): The clock of the session.
+            record (callable): The recording of the events, as RecordingSink.record().
+            code_of (callable): The trigger code of the img_id of the key frame.
+            frames (int): The number of the frames.
+            m (int): The frames between the key frames.
+            compositor (Compositor): The compositor of the frames.
+            flip_rect (tuple, optional): The (x, y, width, height) of the flip block in the frame. Defaults to None, refers flip_block_rect().
+            flip_block_flag (bool, optional): Whether draw the flip block. Defaults to True.
+            flip_baked_flag (bool, optional): Whether the flip block is baked in the frames, refers compile_session(). Defaults to False.
+            counting_flag (bool, optional): Whether draw the counting OSD, it is not drawn in the presenter crossfade mode. Defaults to True.
+            put_text_kwargs (dict, optional): The kwargs of the cv2.putText of the counting OSD. Defaults to None.
+            presenter_crossfade_flag (bool, optional): Whether the presenter crossfades the key frames. Defaults to False.
+            trigger_mode (str, optional): The trigger mode, 'queue' or 'present'. Defaults to 'queue'.
+            trigger_offset_ns (int, optional): The offset from the presented time to the writing in the 'present' mode. Defaults to 0.
+            verbose (bool, optional): Whether print the displayed frames. Defaults to True.
+        """
+        self.screen = screen
+        self.buffer = buffer
+        self.scheduler = scheduler
+        self.parallel = parallel
+        self.clock = clock
+        self.record = record
+        self.code_of = code_of
+
+        self.frames = frames
+        self.m = m
+        self.compositor = compositor
+
+        self.flip_rect = flip_rect or flip_block_rect(compositor)
+        self.flip_block_flag = flip_block_flag
+        self.flip_baked_flag = flip_baked_flag
+        self.counting_flag = counting_flag and not presenter_crossfade_flag
+        self.put_text_kwargs = put_text_kwargs or dict(
+            org=(10, 50), fontFace=cv2.FONT_HERSHEY_SIMPLEX, fontScale=1, color=(0, 200, 0))
+
+        self.presenter_crossfade_flag = presenter_crossfade_flag
+        self.trigger_mode = trigger_mode
+        self.trigger_offset_ns = trigger_offset_ns
+        self.verbose = verbose
+
+        self.frame_idx = 0
+
+    def _skip(self, key_id, mats):
+        """Skip the dropped frames of the skip policy,
+        their key frames are popped to keep the order,
+        and recorded as the skippedKeyFrame with the code they would send.
+
+        Args:
+            key_id (str): The img_id of the current key frame.
+            mats (np.Array): The frames of the current key frame.
+
+        Returns:
+            key_id (str): The img_id of the key frame after the skipping;
+            mats (np.Array): The frames of it, the following interpolated frames are displayed from them.
+        """
+        due_idx = self.scheduler.due(self.frame_idx, self.frames - 1)
+        while self.frame_idx < due_idx:
+            if self.frame_idx % self.m == 0:
+                key_id, mats = self.buffer.pop()
+                self.record('skippedKeyFrame', self.clock.now(), frame_idx=self.frame_idx,
+                            img_id=key_id, code=self.code_of(key_id))
+            self.frame_idx += 1
+        return key_id, mats
+
+    def run(self, running=None):
+        """Run the loop until the frames are displayed.
+
+        Args:
+            running (callable, optional): The loop stops when it returns False. Defaults to None, refers always True.
+
+        Returns:
+            int: The index of the frame the loop stops at.
+        """
+        m = self.m
+        now_ns = self.clock.now_ns
+        x, y, w, h = self.flip_rect
+        draw_flip_flag = self.flip_block_flag and not self.flip_baked_flag
+
+        # The frames are scheduled from the start of the session,
+        # the 0-th frame is due one interval later.
+        self.scheduler.start(now_ns() + self.scheduler.interval_ns)
+
+        key_id, mats = None, None
+        while self.frame_idx < self.frames and (running is None or running()):
+            key_id, mats = self._skip(key_id, mats)
+            frame_idx = self.frame_idx
+
+            key_frame_flag = frame_idx % m == 0
+            if key_frame_flag:
+                key_id, mats = self.buffer.pop()
+
+            # Only attach the id to the key frame
+            id = key_id if key_frame_flag else None
+
+            flip = flip_value(frame_idx, m)
+
+            if self.presenter_crossfade_flag:
+                # The presenter blends the key frames with the flip block marker
+                alpha = (frame_idx % m) / m
+                marker = (x, y, w, h, flip) if self.flip_block_flag else None
+            else:
+                frame = mats[frame_idx % m]
+
+                # Draw the flip block in the left-bottom corner,
+                # it is already in the frames of the compiled session.
+                if draw_flip_flag:
+                    frame[y:y + h, x:x + w] = flip
+
+                # Draw the counting notion in the left-top corner of the image area
+                if self.counting_flag:
+                    cv2.putText(self.compositor.inner(frame), '{} | {}'.format(
+                        frame_idx, self.frames), **self.put_text_kwargs)
+
+            depth = self.buffer.size
+            scheduled_ns = self.scheduler.wait(frame_idx)
+            pre_imshow_ns = now_ns()
+            if self.presenter_crossfade_flag:
+                post_imshow_ns = self.screen.present_blend(alpha, marker)
+            else:
+                post_imshow_ns = self.screen.present(frame)
+
+            # Send the displaying code on the first frame of the interpolating,
+            # the trigger_ns is the rising edge in the 'present' mode, and the queueing time in the 'queue' mode
+            trigger_ns = -1
+            if key_frame_flag:
+                code = self.code_of(id)
+                if self.trigger_mode == 'present':
+                    trigger_ns = self.parallel.send_inline(
+                        code, post_imshow_ns + self.trigger_offset_ns)
+
+            self.screen.poll_key()
+            post_pollkey_ns = now_ns()
+
+            if key_frame_flag and self.trigger_mode != 'present':
+                self.parallel.send(code, verbose=self.verbose)
+                trigger_ns = now_ns()
+
+            t = self.clock.to_time(pre_imshow_ns)
+            self.record('displayImage', t, frame_idx=frame_idx, img_id=id,
+                        scheduled_ns=scheduled_ns, pre_imshow_ns=pre_imshow_ns,
+                        post_imshow_ns=post_imshow_ns, post_pollkey_ns=post_pollkey_ns,
+                        trigger_ns=trigger_ns, depth=depth)
+
+            if self.verbose:
+                print('Display {: 4d} at {:.4f} for {}'.format(frame_idx, t, id))
+
+            self.frame_idx += 1
+
+        LOGGER.debug('Display loop stopped at {} | {}'.format(
+            self.frame_idx, self.frames))
+
+        return self.frame_idx
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,391 @@
+"""
+File: frame_buffer.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    The buffers of the crossfade frames between the key frames
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import threading
+import collections
+
+from .logger import LOGGER
+from .compose import Compositor
+from .crossfade import CrossfadeEngine
+from .ring_buffer import FrameRingBuffer
+from .frame_workers import ProcessFrameSynthesizer
+from .image_stream import StreamingImageLoader
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class VeryFastVeryStableBuffer(object):
+    """The buffer of the crossfade frames between the key frames.
+
+    The frames are stored in the FrameRingBuffer,
+    every slot holds the m frames of one key frame.
+    The auto_append() is the producer, the pop() is the consumer.
+
+    The start() runs one long-lived producer thread,
+    it keeps the buffer filled to the high_water,
+    and it is woken by the consumer through the wake event.
+
+    The 'process' backend hands the crossfade to the worker processes,
+    the slots are in the shared memory and the producer thread only
+    dispatches the tasks and commits the finished slots in order.
+    """
+
+    def __init__(self, images, m=5, capacity=10, high_water=8, backend='thread', workers=2, schedule=None, compositor=None):
+        """Init the buffer.
+
+        Args:
+            images (ImageStack or StreamingImageLoader): The stack of the images, or the streaming loader of them.
+            m (int, optional): The frames between the key frames. Defaults to 5.
+            capacity (int, optional): The slots of the ring buffer. Defaults to 10.
+            high_water (int, optional): The key frames the producer keeps ahead of the display. Defaults to 8.
+            backend (str, optional): The synthesis backend, 'thread' or 'process'. Defaults to 'thread'.
+            workers (int, optional): The worker processes of the 'process' backend. Defaults to 2.
+            schedule (np.Array, optional): The index schedule of the key frames in the stack, it is cycled. Defaults to None, refers the stack order.
+            compositor (Compositor, optional): The compositor of the full-screen frames. Defaults to None, refers the frames are the key frames.
+        """
+        self.images = images
+        self.m = m
+        self.capacity = capacity
+        self.high_water = min(high_water, capacity)
+
+        self.backend = backend
+        self.streaming_flag = isinstance(images, StreamingImageLoader)
+
+        if self.streaming_flag:
+            assert backend == 'thread', 'The streaming images only support the thread backend'
+
+        shape = images.shape
+        if compositor is None:
+            compositor = Compositor((shape[1], shape[0]), shape)
+        self.compositor = compositor
+
+        # The crossfade is written into the image area of the slots,
+        # the letterbox border of the slots is painted once.
+        self.engine = CrossfadeEngine(compositor.shape, m)
+
+        if backend == 'process':
+            self.synthesizer = ProcessFrameSynthesizer(
+                images.stack, m, capacity, workers, compositor)
+            self.ring = self.synthesizer.ring
+        else:
+            self.synthesizer = None
+            self.ring = FrameRingBuffer(
+                capacity, m, compositor.frame_shape,
+                frames=compositor.allocate((capacity, m)))
+
+        # The index schedule of the key frames,
+        # the cursor walks it cyclically.
+        if schedule is None and not self.streaming_flag:
+            schedule = images.schedule(len(images))
+        self.schedule = schedule
+        self.cursor = 0
+
+        # The producer lock keeps the single-producer protocol,
+        # the consumer never takes it.
+        self.producer_lock = threading.Lock()
+
+        self.wake = threading.Event()
+        self.running = False
+        self.producer = None
+        self.lead_min = None
+
+        # The exception of the producer, the pop() raises it
+        self.failed = False
+        self.error = None
+
+    @property
+    def size(self):
+        """The number of the key frames in the buffer."""
+        return self.ring.size
+
+    def ahead(self):
+        """How far the producer is ahead of the display.
+
+        Returns:
+            dict: The key frames and frames in the buffer, and the minimum key frames since the start.
+        """
+        return dict(
+            key_frames=self.size,
+            frames=self.size * self.m,
+            lead_min=self.lead_min,
+        )
+
+    def report(self):
+        """Report the counters of the ring and the lead of the producer.
+
+        Returns:
+            dict: The report.
+        """
+        report = self.ring.report()
+        report.update(self.ahead())
+        return report
+
+    def start(self):
+        """Start the producer thread."""
+        if self.running:
+            return
+
+        if self.synthesizer is not None:
+            self.synthesizer.start()
+            target = self._produce_forever_process
+        else:
+            target = self._produce_forever
+
+        self.running = True
+        self.producer = threading.Thread(
+            target=self._run_producer, args=(target, ), daemon=True)
+        self.producer.start()
+        self.wake.set()
+
+        LOGGER.debug('Producer ({}) started with high water {}'.format(
+            self.backend, self.high_water))
+        return
+
+    def stop(self):
+        """Stop the producer thread,
+        the streaming loader is owned by the buffer, its decoding threads are stopped too.
+        """
+        if not self.running:
+            return
+
+        self.running = False
+        self.wake.set()
+        self.producer.join()
+
+        if self.synthesizer is not None:
+            self.synthesizer.close()
+
+        if self.streaming_flag:
+            self.images.close()
+
+        LOGGER.debug('Producer stopped, {}'.format(self.ahead()))
+        return
+
+    def _run_producer(self, target):
+        """Run the producer loop, its exception is kept for the consumer.
+
+        Args:
+            target (callable): The producer loop.
+        """
+        try:
+            target()
+        except Exception as err:
+            self.error = err
+            self.failed = True
+            LOGGER.error('Producer failed: {}'.format(repr(err)))
+
+    def _produce_forever(self):
+        """The producer loop, it sleeps until the consumer wakes it."""
+        while self.running:
+            self.wake.wait()
+            self.wake.clear()
+
+            while self.running and self.size < self.high_water and not self.ring.is_full():
+                self.auto_append()
+
+    def _produce_forever_process(self):
+        """The producer loop of the 'process' backend.
+
+        It submits the free slots to the workers,
+        and commits the finished slots in the submitting order.
+        """
+        pending = collections.deque()
+        done = set()
+
+        while self.running:
+            # Submit the free slots under the high water
+            while self.size + len(pending) < self.high_water and len(pending) < self.ring.free():
+                slot = self.ring.reserve_index(len(pending))
+                idx1, idx2 = self._next_indexes()
+
+                self.synthesizer.submit(slot, idx1, idx2)
+                pending.append((slot, self.images.ids[idx1]))
+
+            if not pending:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+
+            slot = self.synthesizer.collect(timeout=0.05)
+            if slot is not None:
+                done.add(slot)
+
+            while pending and pending[0][0] in done:
+                slot, id = pending.popleft()
+                done.remove(slot)
+                self.ring.commit(id)
+
+    def _next_indexes(self):
+        """Walk the schedule to the next pair of the key frames.
+
+        Returns:
+            idx1 (int): The stack index of the key frame, it fades out;
+            idx2 (int): The stack index of the next key frame, it fades in.
+        """
+        n = len(self.schedule)
+        idx1 = int(self.schedule[self.cursor % n])
+        idx2 = int(self.schedule[(self.cursor + 1) % n])
+        self.cursor += 1
+        return idx1, idx2
+
+    def clear_buffer(self):
+        """Drop all the key frames in the buffer."""
+        while self.ring.size > 0:
+            self.ring.pop(block=False)
+        self.ring.release()
+        return
+
+    def pop(self, block=True, timeout=None):
+        """Pop the m frames of the next key frame.
+
+        The frames are held by the consumer until the next pop().
+
+        Args:
+            block (bool, optional): Whether wait for the producer when the buffer is empty. Defaults to True.
+            timeout (float, optional): The seconds of waiting in the block mode. Defaults to None, refers waiting until the producer fails.
+
+        Returns:
+            id (str): The img_id of the key frame, None refers under-run;
+            mats (np.Array): The m frames, the shape is (m, height, width, 3), None refers under-run.
+
+        Raises:
+            RuntimeError: The producer failed, and the buffer is empty.
+        """
+        id, mats = self.ring.pop(block=block, timeout=timeout,
+                                 cancel=lambda: self.failed)
+
+        if id is None and self.failed:
+            raise RuntimeError('The producer failed') from self.error
+
+        if self.lead_min is None or self.size < self.lead_min:
+            self.lead_min = self.size
+
+        # Wake the producer to refill the released slot
+        self.wake.set()
+
+        return id, mats
+
+    def auto_append(self):
+        """Append the m frames of the next key frame into the buffer.
+
+        Returns:
+            int: The number of the key frames in the buffer.
+        """
+        with self.producer_lock:
+            out = self.ring.reserve()
+
+            # The buffer is full, the over-run is counted
+            if out is None:
+                return self.size
+
+            if self.streaming_flag:
+                image, next_image = self.images.next_pair()
+                mat1 = image.get('bgr')
+                id = image.get('img_id')
+                mat2 = next_image.get('bgr')
+            else:
+                idx1, idx2 = self._next_indexes()
+                mat1 = self.images.stack[idx1]
+                id = self.images.ids[idx1]
+                mat2 = self.images.stack[idx2]
+
+            self.engine.blend(self.compositor.source(mat1),
+                              self.compositor.source(mat2),
+                              self.compositor.inner(out))
+            self.ring.commit(id)
+
+        return self.size
+
+
+class PresenterCrossfade(object):
+    """The buffer of the key frames for the crossfade in the presenter.
+
+    The wrapped buffer produces the key frames only (m=1),
+    the pop() pushes the next key frame into the presenter,
+    so the presenter holds the key frame and the next one,
+    and the interpolated frames are blended by present_blend().
+    """
+
+    def __init__(self, buffer, full_screen):
+        """Init the crossfade.
+
+        Args:
+            buffer (VeryFastVeryStableBuffer): The buffer of the key frames.
+            full_screen (CV2FullScreen): The full screen display.
+        """
+        self.buffer = buffer
+        self.full_screen = full_screen
+        self.next_id = None
+
+    @property
+    def size(self):
+        """The number of the key frames in the buffer."""
+        return self.buffer.size
+
+    def report(self):
+        return self.buffer.report()
+
+    def stop(self):
+        return self.buffer.stop()
+
+    def _push_next(self, block):
+        self.next_id, mats = self.buffer.pop(block)
+
+        # The buffer under-runs or the session is over,
+        # the presenter keeps the current next key frame.
+        if mats is None:
+            self.next_id = None
+            return
+
+        self.full_screen.push_key(mats[0])
+
+    def pop(self, block=True):
+        """Pop the key frame, the presenter crossfades from it to the next key frame.
+
+        Args:
+            block (bool, optional): Whether wait for the key frame. Defaults to True.
+
+        Returns:
+            key_id (str): The img_id of the key frame, None refers under-run or the session is over;
+            mats (None): The frames are in the presenter.
+        """
+        if self.next_id is None:
+            self._push_next(block)
+
+            if self.next_id is None:
+                return None, None
+
+        key_id = self.next_id
+        self._push_next(block)
+        return key_id, None
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,218 @@
+"""
+File: frame_stats.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Vectorized statistics of the displayed frames of the recording,
+    the inter-frame intervals, the dropped frames and the drift from the schedule.
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+from .logger import LOGGER
+from .recording import EVENT_CODES
+from .session_log import read_session_log
+
+# The interval longer than the ratio of the nominal interval refers the frame is missed
+LONG_INTERVAL_RATIO = 1.5
+
+# The columns read from the csv file
+CSV_COLUMNS = ['time', 'imgId', 'frameIdx', 'recordEvent', 'preImshowNs']
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def load_frames(path):
+    """Load the displayed frames and the key presses from the session log or the csv file.
+
+    The session log is read by its suffix of .bin, the other files are read as the time_recording.csv.
+    The frame time is the preImshowNs if it is recorded, otherwise the time column.
+
+    Args:
+        path (Path): The session log or the csv file.
+
+    Returns:
+        meta (dict): The meta of the session log, empty for the csv file;
+        frames (dict): The arrays of frame_idx, t_ns, img_id and key_flag, one element per displayed frame,
+                       the img_id is empty for the interpolated frames;
+        key_press_t_ns (np.Array): The time of the key presses in nanoseconds, on the clock of the frames.
+    """
+    path = Path(path)
+
+    if path.suffix == '.bin':
+        meta, records = read_session_log(path)
+        event = records['event']
+        time_ns = np.round(records['time'] * 1e9).astype(np.int64)
+        pre = records['pre_imshow_ns'] if 'pre_imshow_ns' in records.dtype.names else None
+        display = event == EVENT_CODES['displayImage']
+        key_press = event == EVENT_CODES['keyPress']
+        frame_idx = records['frame_idx'][display].astype(np.int64)
+        img_id = np.char.decode(records['img_id'][display], errors='replace')
+    else:
+        meta = dict()
+        header = pd.read_csv(path, nrows=0).columns
+        table = pd.read_csv(path, usecols=[c for c in CSV_COLUMNS if c in header])
+        event = table['recordEvent'].to_numpy()
+        time_ns = np.round(table['time'].to_numpy() * 1e9).astype(np.int64)
+        pre = None
+        if 'preImshowNs' in table.columns:
+            pre = table['preImshowNs'].to_numpy(dtype=float, na_value=-1).astype(np.int64)
+        display = event == 'displayImage'
+        key_press = event == 'keyPress'
+        frame_idx = table['frameIdx'].to_numpy()[display].astype(np.int64)
+        img_id = table['imgId'].fillna('').to_numpy(dtype=str)[display]
+
+    # The perf_counter_ns is used only if every frame has it,
+    # and the key presses are moved onto its clock by the offset of the time column
+    t_ns = time_ns[display]
+    key_press_t_ns = time_ns[key_press]
+    if pre is not None and len(t_ns) and (pre[display] >= 0).all():
+        offset_ns = np.median(t_ns - pre[display]).astype(np.int64)
+        t_ns = pre[display]
+        key_press_t_ns = key_press_t_ns - offset_ns
+
+    frames = dict(frame_idx=frame_idx, t_ns=t_ns, img_id=img_id, key_flag=img_id != '')
+
+    LOGGER.debug('Loaded {} frames and {} key presses from {}'.format(
+        len(frame_idx), key_press.sum(), path))
+
+    return meta, frames, key_press_t_ns
+
+
+def describe(x):
+    """Describe the values by the mean, std and percentiles.
+
+    Args:
+        x (np.Array): The values.
+
+    Returns:
+        dict: The description, empty if there is no value.
+    """
+    x = np.asarray(x, dtype=float)
+    if len(x) == 0:
+        return dict()
+
+    p = np.percentile(x, [0, 50, 95, 99, 100])
+    return dict(
+        count=len(x),
+        mean=float(x.mean()),
+        std=float(x.std()),
+        min=float(p[0]),
+        p50=float(p[1]),
+        p95=float(p[2]),
+        p99=float(p[3]),
+        max=float(p[4]),
+    )
+
+
+def frame_stats(frames, nominal_ms=None, long_interval_ratio=LONG_INTERVAL_RATIO):
+    """Compute the statistics of the displayed frames.
+
+    - intervals_ms: the inter-frame intervals, of all, the key frames and the interpolated frames;
+    - skipped: the frames missing in the frameIdx, they are dropped by the scheduler;
+    - long_intervals: the intervals longer than the long_interval_ratio of the nominal interval;
+    - drift_ms: the frame time minus its scheduled time, refers the first frame,
+      and the drift_rate_ppm is the slope of it.
+
+    Args:
+        frames (dict): The frames of load_frames().
+        nominal_ms (float, optional): The nominal inter-frame interval in milliseconds. Defaults to None, refers the median interval.
+        long_interval_ratio (float, optional): The ratio of the long interval. Defaults to LONG_INTERVAL_RATIO.
+
+    Returns:
+        dict: The statistics, the times are in milliseconds.
+    """
+    frame_idx = frames['frame_idx']
+    t_ms = (frames['t_ns'] - frames['t_ns'][:1]) / 1e6 if len(frame_idx) else np.zeros(0)
+
+    # The interval refers the frame and the previous one
+    intervals = np.diff(t_ms)
+    key_flag = frames['key_flag'][1:]
+    steps = np.diff(frame_idx)
+
+    nominal_source = 'provided'
+    if nominal_ms is None:
+        nominal_source = 'median'
+        nominal_ms = float(np.median(intervals / np.maximum(steps, 1))) if len(intervals) else np.nan
+
+    stats = dict(
+        frames=len(frame_idx),
+        duration_ms=float(t_ms[-1]) if len(t_ms) else 0.0,
+        nominal_ms=nominal_ms,
+        nominal_source=nominal_source,
+        intervals_ms=dict(
+            all=describe(intervals),
+            key=describe(intervals[key_flag]),
+            interpolate=describe(intervals[~key_flag]),
+        ),
+        skipped=int(np.clip(steps - 1, 0, None).sum()),
+        long_intervals=int((intervals > nominal_ms * long_interval_ratio).sum()),
+    )
+
+    if len(frame_idx) > 1:
+        scheduled = (frame_idx - frame_idx[0]) * nominal_ms
+        drift = t_ms - scheduled
+        slope = np.polyfit(scheduled, drift, 1)[0] if scheduled[-1] > 0 else 0.0
+        stats.update(drift_ms=dict(
+            last=float(drift[-1]),
+            max=float(drift.max()),
+            min=float(drift.min()),
+        ), drift_rate_ppm=float(slope * 1e6))
+
+    return stats
+
+
+def summarize(path, nominal_ms=None):
+    """Summarize the recording, the nominal interval is the frame_interval_ns of the session log if not provided.
+
+    Args:
+        path (Path): The session log or the csv file.
+        nominal_ms (float, optional): The nominal inter-frame interval in milliseconds. Defaults to None, refers the frame_interval_ns of the meta or the median interval.
+
+    Returns:
+        dict: The summary.
+    """
+    meta, frames, key_press_t_ns = load_frames(path)
+
+    # The frame_interval_ns of 0 refers the frames are free-running, the median is used
+    nominal_source = None
+    if nominal_ms is None and meta.get('frame_interval_ns', 0) > 0:
+        nominal_ms = meta['frame_interval_ns'] / 1e6
+        nominal_source = 'meta'
+
+    summary = dict(path=str(path))
+    summary.update(frame_stats(frames, nominal_ms))
+    if nominal_source is not None:
+        summary.update(nominal_source=nominal_source)
+    summary.update(key_presses=len(key_press_t_ns))
+
+    return summary
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
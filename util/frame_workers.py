@@ -0,0 +1,244 @@
+"""
+File: frame_workers.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Multiprocess frame synthesis with shared-memory frames
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import queue
+import multiprocessing as mp
+import numpy as np
+
+from multiprocessing import shared_memory
+
+from .logger import LOGGER
+from .compose import Compositor
+from .crossfade import CrossfadeEngine
+from .ring_buffer import FrameRingBuffer
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def create_shared_array(shape, dtype=np.uint8):
+    """Create the ndarray in the new shared memory block.
+
+    Args:
+        shape (tuple): The shape of the array.
+        dtype (np.dtype, optional): The dtype of the array. Defaults to np.uint8.
+
+    Returns:
+        shm (SharedMemory): The shared memory block, keep it alive with the array;
+        array (np.Array): The array in the block.
+    """
+    nbytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, array
+
+
+def attach_shared_array(name, shape, dtype=np.uint8):
+    """Attach the ndarray in the existing shared memory block.
+
+    Args:
+        name (str): The name of the shared memory block.
+        shape (tuple): The shape of the array.
+        dtype (np.dtype, optional): The dtype of the array. Defaults to np.uint8.
+
+    Returns:
+        shm (SharedMemory): The shared memory block, keep it alive with the array;
+        array (np.Array): The array in the block.
+    """
+    shm = shared_memory.SharedMemory(name=name)
+    array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return shm, array
+
+
+def _synthesis_worker(stack_spec, ring_spec, src, dst, m, tasks, results):
+    """The worker process of the frame synthesis.
+
+    It blends the key frames in the stack into the slots of the ring,
+    and reports the slot index back when it is finished.
+
+    Args:
+        stack_spec (tuple): The (name, shape) of the shared key frame stack.
+        ring_spec (tuple): The (name, shape) of the shared ring frames.
+        src (tuple): The slices of the visible part of the key frame.
+        dst (tuple): The slices of the image area of the frame.
+        m (int): The frames between the key frames.
+        tasks (Queue): The tasks of (slot, idx1, idx2), None refers stop.
+        results (Queue): The finished slot indexes.
+    """
+    stack_shm, stack = attach_shared_array(*stack_spec)
+    ring_shm, ring = attach_shared_array(*ring_spec)
+
+    inner = (slice(None), ) + dst
+    engine = CrossfadeEngine(stack[0][src].shape, m)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+
+        slot, idx1, idx2 = task
+        engine.blend(stack[idx1][src], stack[idx2][src], ring[slot][inner])
+        results.put(slot)
+
+    del stack, ring
+    stack_shm.close()
+    ring_shm.close()
+
+
+class ProcessFrameSynthesizer(object):
+    """The multiprocess backend of the frame synthesis.
+
+    The key frames are copied into the shared memory once,
+    the slots of the FrameRingBuffer are in the shared memory too,
+    they are in the screen resolution and the letterbox border is painted once.
+    The workers write the crossfade frames into the slots,
+    and only the slot indexes are handed back to the player.
+    """
+
+    def __init__(self, key_frames, m=5, capacity=10, workers=2, compositor=None):
+        """Init the synthesizer.
+
+        Args:
+            key_frames (list): The uint8 key frames in the same shape of (height, width, 3).
+            m (int, optional): The frames between the key frames. Defaults to 5.
+            capacity (int, optional): The slots of the ring buffer. Defaults to 10.
+            workers (int, optional): The number of the worker processes. Defaults to 2.
+            compositor (Compositor, optional): The compositor of the frames. Defaults to None, refers the frames are the key frames.
+        """
+        shape = key_frames[0].shape
+
+        if compositor is None:
+            compositor = Compositor((shape[1], shape[0]), shape)
+        self.compositor = compositor
+
+        self.stack_shm, self.stack = create_shared_array(
+            (len(key_frames), ) + shape)
+        for dst, src in zip(self.stack, key_frames):
+            np.copyto(dst, src)
+
+        self.ring_shm, frames = create_shared_array(
+            (capacity, m) + compositor.frame_shape)
+        compositor.paint_background(frames)
+        self.ring = FrameRingBuffer(
+            capacity, m, compositor.frame_shape, frames=frames)
+
+        self.m = m
+        self.workers = workers
+
+        # The workers are spawned on every platform,
+        # the script is guarded by the __main__ check, so it is not re-run in them.
+        self.context = mp.get_context('spawn')
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.processes = []
+
+        LOGGER.debug('Process synthesizer with {} workers, {} key frames'.format(
+            workers, len(key_frames)))
+
+    def start(self):
+        """Start the worker processes."""
+        stack_spec = (self.stack_shm.name, self.stack.shape)
+        ring_spec = (self.ring_shm.name, self.ring.frames.shape)
+
+        for _ in range(self.workers):
+            p = self.context.Process(target=_synthesis_worker,
+                                     args=(stack_spec, ring_spec,
+                                           self.compositor.src, self.compositor.dst,
+                                           self.m, self.tasks, self.results),
+                                     daemon=True)
+            p.start()
+            self.processes.append(p)
+
+        LOGGER.debug('Started {} synthesis workers'.format(len(self.processes)))
+        return
+
+    def submit(self, slot, idx1, idx2):
+        """Submit the crossfade of the key frames idx1 -> idx2 into the slot.
+
+        Args:
+            slot (int): The slot index of the ring.
+            idx1 (int): The index of the key frame, it fades out.
+            idx2 (int): The index of the key frame, it fades in.
+        """
+        self.tasks.put((slot, idx1, idx2))
+
+    def collect(self, timeout=None):
+        """Collect the finished slot.
+
+        Args:
+            timeout (float, optional): The seconds of waiting. Defaults to None, refers waiting forever.
+
+        Returns:
+            int: The finished slot index, None refers timeout.
+
+        Raises:
+            RuntimeError: The worker is dead.
+        """
+        try:
+            return self.results.get(timeout=timeout)
+        except queue.Empty:
+            pass
+
+        for p in self.processes:
+            if not p.is_alive():
+                raise RuntimeError('Synthesis worker {} is dead with exitcode {}'.format(
+                    p.pid, p.exitcode))
+
+        return None
+
+    def close(self):
+        """Stop the workers and release the shared memory."""
+        for _ in self.processes:
+            self.tasks.put(None)
+
+        for p in self.processes:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+
+        self.processes = []
+
+        del self.stack
+        self.ring.frames = None
+        for shm in [self.stack_shm, self.ring_shm]:
+            try:
+                shm.close()
+            except BufferError:
+                # The frames are still referred by the player,
+                # the block is released when they are gone.
+                LOGGER.warning(
+                    'Shared memory {} is still in use'.format(shm.name))
+            shm.unlink()
+
+        LOGGER.debug('Closed process synthesizer')
+        return
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
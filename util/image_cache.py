@@ -0,0 +1,204 @@
+"""
+File: image_cache.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Content-addressed decoded-image cache across runs
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import os
+import hashlib
+import threading
+import numpy as np
+
+from pathlib import Path
+
+from .logger import LOGGER
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class DecodedImageCache(object):
+    """The on-disk cache of the decoded images.
+
+    The images are the ready-to-display BGR uint8 arrays,
+    they are saved in the .npy format and loaded in memory-mapped mode.
+
+    The key is computed by the file path, mtime, size and target resolution and resize mode,
+    so the changed file or target misses the cache automatically.
+
+    The cache is bounded by max_bytes with LRU eviction,
+    the mtime of the cached file refers its last access.
+    """
+
+    def __init__(self, folder, max_bytes=4 * 1024**3):
+        """Init the cache.
+
+        Args:
+            folder (Path): The folder of the cache files.
+            max_bytes (int, optional): The max size of the cache. Defaults to 4GB.
+        """
+        self.folder = Path(folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        # The sizes of the cached files,
+        # the .tmp files are left by the interrupted writing, they are removed.
+        self.sizes = dict()
+        for e in os.scandir(self.folder):
+            if e.name.endswith('.npy'):
+                self.sizes[e.path] = e.stat().st_size
+            elif e.name.endswith('.tmp'):
+                try:
+                    os.remove(e.path)
+                    LOGGER.debug('Removed stale {}'.format(e.path))
+                except OSError as err:
+                    LOGGER.warning('Failed to remove stale {}: {}'.format(e.path, err))
+
+        LOGGER.debug('Image cache {} with {} files ({} bytes)'.format(
+            self.folder, len(self.sizes), sum(self.sizes.values())))
+
+    def key(self, path, target):
+        """Compute the key of the image file.
+
+        Args:
+            path (Path): The path of the image file.
+            target (tuple): The target of the decoding, (width, height, resize_mode).
+
+        Returns:
+            str: The hex digest of the key.
+        """
+        path = Path(path).resolve()
+        stat = path.stat()
+        raw = '{}|{}|{}|{}'.format(
+            path, stat.st_mtime_ns, stat.st_size, 'x'.join(map(str, target)))
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def _cache_path(self, key):
+        return str(self.folder.joinpath('{}.npy'.format(key)))
+
+    def get(self, path, target):
+        """Get the cached image.
+
+        Args:
+            path (Path): The path of the image file.
+            target (tuple): The target of the decoding, (width, height, resize_mode).
+
+        Returns:
+            np.Array: The read-only memory-mapped BGR array, None refers the cache missed.
+        """
+        cache_path = self._cache_path(self.key(path, target))
+
+        try:
+            bgr = np.load(cache_path, mmap_mode='r')
+            # Touch the file as the access for the LRU eviction
+            os.utime(cache_path)
+        except (OSError, ValueError):
+            with self.lock:
+                self.misses += 1
+            return None
+
+        with self.lock:
+            self.hits += 1
+        return bgr
+
+    def put(self, path, target, bgr):
+        """Put the image into the cache.
+
+        Args:
+            path (Path): The path of the image file.
+            target (tuple): The target of the decoding, (width, height, resize_mode).
+            bgr (np.Array): The BGR uint8 array.
+        """
+        cache_path = self._cache_path(self.key(path, target))
+
+        # Write into the temporary file and replace,
+        # so the partial file is never loaded.
+        tmp_path = '{}.{}.tmp'.format(cache_path, threading.get_ident())
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, np.ascontiguousarray(bgr))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self.lock:
+            self.sizes[cache_path] = os.path.getsize(cache_path)
+
+        self.evict()
+
+    def evict(self):
+        """Evict the least recently used files until the cache is under the max_bytes."""
+        with self.lock:
+            total = sum(self.sizes.values())
+            if total <= self.max_bytes:
+                return
+
+            def atime(p):
+                try:
+                    return os.path.getmtime(p)
+                except OSError:
+                    return 0
+
+            for cache_path in sorted(self.sizes, key=atime):
+                if total <= self.max_bytes:
+                    break
+
+                # The accounting is updated only if the file is gone,
+                # the file in use (mapped on Windows) is kept and counted.
+                try:
+                    os.remove(cache_path)
+                except FileNotFoundError:
+                    pass
+                except OSError as err:
+                    LOGGER.warning('Failed to evict {}: {}'.format(cache_path, err))
+                    continue
+
+                total -= self.sizes.pop(cache_path)
+                LOGGER.debug('Evicted {}'.format(cache_path))
+
+    def report(self):
+        """Report the hits and misses.
+
+        Returns:
+            dict: The report.
+        """
+        return dict(
+            folder=str(self.folder),
+            files=len(self.sizes),
+            bytes=sum(self.sizes.values()),
+            hits=self.hits,
+            misses=self.misses,
+        )
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
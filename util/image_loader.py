@@ -26,45 +26,254 @@ import requests
 import threading
 import traceback
 
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+
 import numpy as np
 
 from .constant import *
+from .compose import center_slices
 
 
 # %% ---- 2023-07-10 ------------------------
 # Function and class
+
+
+def choose_interpolation(scale):
+    """Choose the interpolation method by the scale factor,
+    the INTER_AREA prevents the aliasing when shrinking,
+    the INTER_CUBIC is sharper when enlarging.
+
+    Args:
+        scale (float): The scale factor, less than 1 refers shrinking.
+
+    Returns:
+        int: The cv2 interpolation flag.
+    """
+    if scale < 1:
+        return cv2.INTER_AREA
+    if scale > 1:
+        return cv2.INTER_CUBIC
+    return cv2.INTER_NEAREST
+
+
+def resize_to_target(bgr, target_size, mode='fit', background=(100, 100, 100)):
+    """Resize the bgr into the target size.
+
+    The modes are
+    - stretch: resize into the target size, the aspect is ignored;
+    - fit: keep the aspect, the whole image is inside the target, the border is painted with the background;
+    - fill: keep the aspect, the target is covered, the overflow is cropped in the center.
+
+    Args:
+        bgr (np.Array): The BGR uint8 array.
+        target_size (tuple): The target size, (width, height).
+        mode (str, optional): The resize mode, 'stretch', 'fit' or 'fill'. Defaults to 'fit'.
+        background (tuple, optional): The BGR color of the border in the fit mode. Defaults to (100, 100, 100).
+
+    Returns:
+        np.Array: The BGR uint8 array, the shape is (height, width, 3).
+    """
+    width, height = target_size
+    h, w = bgr.shape[:2]
+
+    if (w, h) == (width, height):
+        return bgr
+
+    if mode == 'stretch':
+        scale = min(width / w, height / h)
+        return cv2.resize(bgr, (width, height),
+                          interpolation=choose_interpolation(scale))
+
+    assert mode in ('fit', 'fill'), 'Unknown resize mode: {}'.format(mode)
+
+    if mode == 'fit':
+        scale = min(width / w, height / h)
+    else:
+        scale = max(width / w, height / h)
+
+    size = (max(1, round(w * scale)), max(1, round(h * scale)))
+    resized = cv2.resize(bgr, size, interpolation=choose_interpolation(scale))
+
+    # Place the resized in the center of the target,
+    # it is cropped in the fill mode and bordered in the fit mode.
+    out = np.empty((height, width, 3), dtype=np.uint8)
+    out[...] = np.array(background, dtype=np.uint8)
+
+    dst_y, src_y = center_slices(height, size[1])
+    dst_x, src_x = center_slices(width, size[0])
+    out[dst_y, dst_x] = resized[src_y, src_x]
+
+    return out
+
+
+def image_size_from_rect(image_rect, max_size=None):
+    """Compute the target image size from the image rect of the full screen window.
+
+    Args:
+        image_rect (4 elements tuple): The rect in the format of (x, y, width, height).
+        max_size (tuple, optional): The max size, (width, height). Defaults to None, refers no limit.
+
+    Returns:
+        tuple: The target image size, (width, height).
+    """
+    width, height = image_rect[2], image_rect[3]
+    if max_size is not None:
+        width, height = min(width, max_size[0]), min(height, max_size[1])
+    return (int(width), int(height))
+
+
+# The reduced-resolution decoding flags of the JPEG, by the reduction factor
+REDUCED_DECODE_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def reduction_factor(size, target_size, mode='fit'):
+    """Compute the largest reduction factor of the JPEG DCT-scaled decoding,
+    the reduced image still covers the target size in the resize mode,
+    so the following resize only shrinks it.
+
+    Args:
+        size (tuple): The size of the source image, (width, height).
+        target_size (tuple): The target size, (width, height).
+        mode (str, optional): The resize mode, 'stretch', 'fit' or 'fill'. Defaults to 'fit'.
+
+    Returns:
+        int: The reduction factor, 1, 2, 4 or 8, 1 refers the full decoding.
+    """
+    scale_x, scale_y = target_size[0] / size[0], target_size[1] / size[1]
+
+    if mode == 'fit':
+        scale = min(scale_x, scale_y)
+    else:
+        scale = max(scale_x, scale_y)
+
+    for factor in sorted(REDUCED_DECODE_FLAGS, reverse=True):
+        if factor * scale <= 1:
+            return factor
+
+    return 1
+
+
+def decode_bgr(path, target_size=None, mode='fit'):
+    """Decode the image file straight into the BGR array,
+    the PIL is the fallback for the formats cv2 can not decode.
+
+    The JPEG much larger than the target size is decoded in the reduced resolution,
+    the factor is computed from the size in the header, refers reduction_factor().
+    The EXIF orientation is ignored as the PIL does, so every path keeps the stored orientation.
+
+    Args:
+        path (Path): The local image path.
+        target_size (tuple, optional): The target size, (width, height). Defaults to None, refers the full decoding.
+        mode (str, optional): The resize mode, 'stretch', 'fit' or 'fill'. Defaults to 'fit'.
+
+    Raises:
+        Exception: The image can not be read.
+
+    Returns:
+        bgr (np.Array): The BGR uint8 array, in the original or reduced size;
+        decode_path (str): The decoding path, 'cv2', 'cv2-reduced-N' or 'pil'.
+    """
+    factor = 1
+    if target_size is not None:
+        # Only the header is read
+        with Image.open(Path(path)) as img:
+            if img.format == 'JPEG':
+                factor = reduction_factor(img.size, target_size, mode)
+
+    raw = np.fromfile(str(path), dtype=np.uint8)
+
+    if factor > 1:
+        bgr = cv2.imdecode(raw, REDUCED_DECODE_FLAGS[factor] | cv2.IMREAD_IGNORE_ORIENTATION)
+        decode_path = 'cv2-reduced-{}'.format(factor)
+    else:
+        bgr = cv2.imdecode(raw, cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        decode_path = 'cv2'
+
+    if bgr is None:
+        with Image.open(Path(path)) as img:
+            bgr = cv2.cvtColor(np.asarray(img.convert(mode='RGB')), cv2.COLOR_RGB2BGR)
+        decode_path = 'pil'
+
+    return bgr, decode_path
+
+
 class MyImage(object):
     """The base class for the image
 
     Load the image by the following methods:
     - from_local
+    - load_local
     - from_url
     - from_PIL
     - from_bytes
+    - from_bgr
 
-    Use the self.image as the img information.
+    The record is compact, it only holds the BGR array, the img_id and the tag,
+    the bgr can be a view of the shared contiguous stack, see util.image_stack.ImageStack.
+    The PIL image and the detail are built lazily on demand.
+    The decode_path records how the image is decoded, refers decode_bgr().
     """
 
+    __slots__ = ('bgr', 'img_id', 'tag', 'decode_path', '_detail')
+
+    # The target size, (width, height),
+    # the player derives it from the image rect of the full screen window.
     image_size = (800, 800)
 
+    # The resize mode, 'stretch', 'fit' or 'fill', refers resize_to_target()
+    resize_mode = 'stretch'
+    background_bgr = (100, 100, 100)
+
+    # The keys of the lazily computed detail
+    detail_keys = ('ext', 'mode', 'format', 'bytes_io', 'md5_hash',
+                   'get_bytes', 'get_hexdigest', 'unique_id', 'unique_fname')
+
     def __init__(self):
-        self.image = None
-        pass
+        self.bgr = None
+        self.img_id = None
+        self.tag = None
+        self.decode_path = None
+        self._detail = None
+
+    @property
+    def loaded(self):
+        """Whether the image is loaded."""
+        return self.bgr is not None
 
     def get(self, key):
-        """Get the key information from the img dictionary
+        """Get the key information of the image
 
         Args:
-            key (str): The key to fetch
+            key (str): The key to fetch, the 'img' and the detail keys are computed on demand.
 
         Returns:
-            ob: The value of the key in self.image
+            ob: The value of the key
         """
+        if key in ('bgr', 'img_id', 'tag'):
+            return getattr(self, key)
+
+        if key == 'img':
+            return self.to_PIL()
+
+        if key in self.detail_keys:
+            return self.detail()[key]
 
-        if not key in self.image:
-            LOGGER.error('Failed to get key {}'.format(key))
+        LOGGER.error('Failed to get key {}'.format(key))
+        return None
 
-        return self.image.get(key, None)
+    def to_PIL(self):
+        """Build the PIL image from the bgr.
+
+        Returns:
+            Image: The image in RGB mode, None refers the image is not loaded.
+        """
+        if self.bgr is None:
+            return None
+        return Image.fromarray(cv2.cvtColor(self.bgr, cv2.COLOR_BGR2RGB))
 
     def compute_img_everything(self, img: Image, img_id: str, require_detail_flag=False):
         """Compute all the information from the img object
@@ -75,7 +284,7 @@ class MyImage(object):
             require_detail_flag (Bool): Whether compute the detail of the image, default is False.
 
         Returns:
-            dict: The information of the img object.
+            MyImage: The self, None refers the img is None.
         """
         # Necessary checks
         if img is None:
@@ -84,54 +293,75 @@ class MyImage(object):
         assert isinstance(
             img, Image.Image), 'The [img] must be an Image instance'
 
-        # Constant
-        format = 'jpeg'
-        ext = 'jpg'
         mode = 'RGB'
-        create_time = time.time()
+
+        # Decode the large JPEG in the reduced resolution,
+        # it only works before the img is loaded.
+        self.decode_path = 'pil'
+        if img.format == 'JPEG':
+            factor = reduction_factor(
+                img.size, self.image_size, self.resize_mode)
+            if factor > 1 and img.draft(mode, (img.size[0] // factor, img.size[1] // factor)):
+                self.decode_path = 'pil-draft-{}'.format(factor)
 
         # Convert into RGB format
         if img.mode != mode:
             img = img.convert(mode=mode)
 
-        if not all((img.size[0] == self.image_size[0], img.size[1] == self.image_size[1])):
-            img = img.resize(self.image_size)
+        bgr = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+        return self.compute_bgr_everything(bgr, img_id, require_detail_flag)
 
-        bgr = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+    def compute_bgr_everything(self, bgr: np.ndarray, img_id: str, require_detail_flag=False):
+        """Compute all the information from the decoded bgr array,
+        the bgr is resized into the image_size in the resize_mode.
 
-        self.image = dict(
-            img=img,
-            bgr=bgr,
-            img_id=img_id,
-            # ---------------------------------
-            ext=ext,
-            mode=mode,
-            format=format,
-            create_time=create_time,
-            # ---------------------------------
-            bytes_io=None,
-            md5_hash=None,
-            get_bytes=None,
-            get_hexdigest=None,
-            # ---------------------------------
-            unique_id=None,
-            unique_fname=None,
-        )
+        Args:
+            bgr (np.ndarray): The BGR uint8 array in any size.
+            image_id (str): The id of the image.
+            require_detail_flag (Bool): Whether compute the detail of the image, default is False.
+
+        Returns:
+            MyImage: The self.
+        """
+        self.bgr = resize_to_target(
+            bgr, self.image_size, mode=self.resize_mode, background=self.background_bgr)
+        self.img_id = img_id
+        self._detail = None
 
-        # Compute the details in the separate thread
         if require_detail_flag:
-            threading.Thread(target=self._compute_detail, daemon=True).run()
+            self.detail()
 
-        return self.image
+        return self
+
+    @classmethod
+    def target(cls):
+        """The target of the decoding, it is used as the key of the decoded image cache.
+
+        Returns:
+            tuple: The (width, height, resize_mode).
+        """
+        return (cls.image_size[0], cls.image_size[1], cls.resize_mode)
+
+    def detail(self):
+        """Get the detail of the image, it is computed at the first call.
+
+        Returns:
+            dict: The detail of the image.
+        """
+        if self._detail is None:
+            self._detail = self._compute_detail()
+        return self._detail
 
     def _compute_detail(self):
-        """Compute the detail of the image,
-        it is designed to be running in a separate thread.
+        """Compute the detail of the image.
+
+        Returns:
+            dict: The detail of the image.
         """
         tic = time.time()
-        img = self.image['img']
-        ext = self.image['ext']
-        format = self.image['format']
+        img = self.to_PIL()
+        ext = 'jpg'
+        format = 'jpeg'
 
         # Write into the BytesIO
         bytes_io = io.BytesIO()
@@ -141,19 +371,24 @@ class MyImage(object):
         md5_hash = hashlib.md5()
         md5_hash.update(bytes_io.getvalue())
 
-        self.image['bytes_io'] = bytes_io
-        self.image['md5_hash'] = md5_hash
-        self.image['get_bytes'] = bytes_io.getvalue
-        self.image['get_hexdigest'] = md5_hash.hexdigest
-        self.image['unique_id'] = md5_hash.hexdigest()
-        self.image['unique_fname'] = '{}.{}'.format(md5_hash.hexdigest(), ext)
+        detail = dict(
+            ext=ext,
+            mode=img.mode,
+            format=format,
+            bytes_io=bytes_io,
+            md5_hash=md5_hash,
+            get_bytes=bytes_io.getvalue,
+            get_hexdigest=md5_hash.hexdigest,
+            unique_id=md5_hash.hexdigest(),
+            unique_fname='{}.{}'.format(md5_hash.hexdigest(), ext),
+        )
 
         toc = time.time()
         LOGGER.debug('Finish detail ({:0.4f}) for image {}'.format(
             toc - tic,
-            self.image['unique_id']))
+            detail['unique_id']))
 
-        return
+        return detail
 
     def null(self):
         return
@@ -172,7 +407,7 @@ class MyImage(object):
                              wait it until finishes.
         """
         try:
-            self.image = None
+            self.bgr = None
             img = Image.open(Path(path))
 
             thread = threading.Thread(
@@ -185,6 +420,44 @@ class MyImage(object):
             traceback.print_exc()
         return self, thread
 
+    def load_local(self, path: Path, img_id: str):
+        """Load the image from a local image path in the current thread.
+
+        It is designed to be running in the thread pool,
+        the file handle is released before it returns.
+
+        Args:
+            path (Path): The local image path.
+            image_id (str): The id of the image.
+
+        Raises:
+            Exception: The image can not be read.
+
+        Returns:
+            self (MyImage).
+        """
+        bgr, self.decode_path = decode_bgr(
+            path, self.image_size, self.resize_mode)
+        self.compute_bgr_everything(bgr, img_id)
+        return self
+
+    def from_bgr(self, bgr: np.ndarray, img_id: str):
+        """Init the image from the ready-to-display BGR array,
+        it is used by the decoded image cache.
+
+        Args:
+            bgr (np.ndarray): The BGR uint8 array in the size of image_size.
+            image_id (str): The id of the image.
+
+        Returns:
+            self (MyImage).
+        """
+        self.bgr = bgr
+        self.img_id = img_id
+        self.decode_path = 'cache'
+        self._detail = None
+        return self
+
     def from_url(self, url: str, img_id: str):
         """Init the image from a url
 
@@ -193,13 +466,12 @@ class MyImage(object):
             image_id (str): The id of the image.
 
         Returns:
-            dict: The img info of the image
+            self (MyImage).
         """
         try:
-            self.image = None
+            self.bgr = None
             img = Image.open(requests.get(url, stream=True).raw)
             self.compute_img_everything(img, img_id)
-            # print('Created image: {}'.format(self.image))
         except:
             LOGGER.error('Can not read image from url: {}'.format(url))
             traceback.print_exc()
@@ -213,12 +485,11 @@ class MyImage(object):
             image_id (str): The id of the image.
 
         Returns:
-            dict: The img info of the image
+            self (MyImage).
         """
         try:
-            self.image = None
+            self.bgr = None
             self.compute_img_everything(img, img_id)
-            # print('Created image: {}'.format(self.image))
         except:
             LOGGER.error('Can not read image from img')
             traceback.print_exc()
@@ -232,21 +503,68 @@ class MyImage(object):
             image_id (str): The id of the image.
 
         Returns:
-            dict: The img info of the image
+            self (MyImage).
         """
 
         try:
-            self.image = None
+            self.bgr = None
             img = Image.open(raw)
             self.compute_img_everything(img, img_id)
-            # print('Created image: {}'.format(self.image))
         except:
             LOGGER.error('Can not read image from bytes')
             traceback.print_exc()
         return self
 
 
-def read_local_images(folder, limit=200):
+def load_local_cached(path, img_id, cache=None):
+    """Load the image from the local path, the cache is hit first.
+
+    Args:
+        path (Path): The local image path.
+        img_id (str): The id of the image.
+        cache (DecodedImageCache, optional): The decoded image cache. Defaults to None, refers no cache.
+
+    Returns:
+        MyImage: The loaded image.
+    """
+    if cache is not None:
+        bgr = cache.get(path, MyImage.target())
+        if bgr is not None:
+            return MyImage().from_bgr(bgr, img_id)
+
+    my_img = MyImage().load_local(path, img_id)
+
+    if cache is not None:
+        cache.put(path, MyImage.target(), my_img.get('bgr'))
+
+    return my_img
+
+
+def list_local_images(folder, limit=200):
+    """List the local images in the given folder with the number limit,
+    the images are not read.
+
+    Args:
+        folder (Path or str): The folder to list the images from;
+        limit (int, optional): The limit of the images. Defaults to 200.
+
+    Returns:
+        file_list (list): The file_list of (path, img_id, tag), None refers the folder does not exist.
+    """
+    folder = Path(folder)
+    if not folder.is_dir():
+        LOGGER.error('Folder does not exist: {}'.format(folder))
+        return
+
+    # (path, img_id, tag)
+    file_list = [(path, 'nothing.' + path.name, 'nothing')
+                 for path in tqdm(folder.iterdir(), 'Find files')
+                 if path.is_file()][:limit]
+
+    return file_list
+
+
+def read_local_images(folder, limit=200, workers=8, max_in_flight=32, cache=None):
     """Read the local images in the given folder with the number limit.
 
     It supports all the files in the folder are image files.
@@ -256,6 +574,9 @@ def read_local_images(folder, limit=200):
     Args:
         folder (Path or str): The folder to read the images from;
         limit (int, optional): The limit of reading images. Defaults to 20.
+        workers (int, optional): The number of the decoding threads. Defaults to 8.
+        max_in_flight (int, optional): The max number of the submitted files. Defaults to 32.
+        cache (DecodedImageCache, optional): The decoded image cache. Defaults to None, refers no cache.
 
     Returns:
         file_list (list): The file_list;
@@ -263,23 +584,18 @@ def read_local_images(folder, limit=200):
         tag_table (dict): The tag table of the img_id.
 
     """
-    folder = Path(folder)
-    if not folder.is_dir():
-        LOGGER.error('Folder does not exist: {}'.format(folder))
+    file_list = list_local_images(folder, limit)
+    if file_list is None:
         return
 
-    # (path, img_id, tag)
-    file_list = [(path, 'nothing.' + path.name, 'nothing')
-                 for path in tqdm(folder.iterdir(), 'Find files')
-                 if path.is_file()][:limit]
-
-    images, tag_table = read_from_file_list(file_list)
+    images, tag_table = read_from_file_list(
+        file_list, workers=workers, max_in_flight=max_in_flight, cache=cache)
     return file_list, images, tag_table
 
     raws = [MyImage().from_local(f, f.name)
             for f in tqdm(files, 'Load images')]
 
-    images = [e for e in raws if e.image is not None]
+    images = [e for e in raws if e.loaded]
 
     LOGGER.info('Loaded ({} | {}) images from {}'.format(
         len(images), len(files), folder))
@@ -287,50 +603,82 @@ def read_local_images(folder, limit=200):
     return images
 
 
-def read_from_file_list(file_list):
+def read_from_file_list(file_list, workers=8, max_in_flight=32, cache=None, on_loaded=None):
     """Read images from the file_list.
 
     The elements are the tuple of (path, img_id, tag) 
 
+    The images are decoded in the thread pool of the workers,
+    and at most max_in_flight files are submitted at the same time,
+    so the open file handles are bounded.
+    The decoded image cache is hit first if it is provided.
+
     Args:
         file_list (list): The file_list to be read;
         path (Path): The path of the image;
         img_id (str): The img_id of the image;
         tag (str): The tag of the image;
+        workers (int, optional): The number of the decoding threads. Defaults to 8.
+        max_in_flight (int, optional): The max number of the submitted files. Defaults to 32.
+        cache (DecodedImageCache, optional): The decoded image cache. Defaults to None, refers no cache.
+        on_loaded (callable, optional): It is called with (idx, my_img) in the calling thread once the idx-th image is loaded. Defaults to None.
 
     Returns:
-        _type_: _description_
+        images (list): The images in the object of MyImage, in the order of the file_list;
+        tag_table (dict): The tag table of the img_id.
     """
-    images = []
-    threads = []
+    images = [None for _ in file_list]
+    failures = []
+    decode_paths = collections.Counter()
     tag_table = dict()
-
-    for path, img_id, tag in tqdm(file_list, 'Reading files...'):
-        path = Path(path)
-
-        my_img, thread = MyImage().from_local(path, img_id)
-        threads.append(thread)
-        images.append(my_img)
-
-        if img_id in tag_table:
-            LOGGER.warning('Repeat img_id, {} = {}'.format(
-                img_id, tag_table[img_id]))
-
-        tag_table[img_id] = tag
-
-    for t in tqdm(threads, 'Join threads...'):
-        t.join()
-
-    LOGGER.debug('Loading images finished.')
-
-    for my_img in images:
-        if my_img.image is not None:
-            pass
-        else:
-            LOGGER.error(
-                'Can not load image {}, {}, {}'.format(tag, img_id, path))
-
-    images = [e for e in images if e.image is not None]
+    in_flight = dict()
+
+    def finish(return_when):
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            idx = in_flight.pop(future)
+            path, img_id, tag = file_list[idx]
+            try:
+                images[idx] = future.result()
+                images[idx].tag = tag
+                decode_paths[images[idx].decode_path] += 1
+                if on_loaded is not None:
+                    on_loaded(idx, images[idx])
+            except Exception as err:
+                failures.append((path, img_id, tag, err))
+                LOGGER.error('Can not load image {}, {}, {}: {}'.format(
+                    tag, img_id, path, err))
+            progress.update(1)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor, \
+            tqdm(total=len(file_list), desc='Reading files...') as progress:
+        for idx, (path, img_id, tag) in enumerate(file_list):
+            if len(in_flight) >= max_in_flight:
+                finish(FIRST_COMPLETED)
+
+            future = executor.submit(
+                load_local_cached, Path(path), img_id, cache)
+            in_flight[future] = idx
+
+            if img_id in tag_table:
+                LOGGER.warning('Repeat img_id, {} = {}'.format(
+                    img_id, tag_table[img_id]))
+
+            tag_table[img_id] = tag
+
+        finish(ALL_COMPLETED)
+
+    LOGGER.debug('Loading images finished, the decode paths are {}'.format(
+        dict(decode_paths)))
+
+    if failures:
+        LOGGER.warning('Failed to load {} | {} images'.format(
+            len(failures), len(file_list)))
+
+    images = [e for e in images if e is not None]
+
+    if cache is not None:
+        LOGGER.debug('Image cache: {}'.format(cache.report()))
 
     LOGGER.debug('Loaded {} | {} images from file_list, tags are {}'.format(
         len(images), len(file_list), set([e for e in tag_table.values()])))
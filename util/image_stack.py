@@ -0,0 +1,175 @@
+"""
+File: image_stack.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Single contiguous image stack with index-based scheduling
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import json
+import numpy as np
+
+from pathlib import Path
+
+from .logger import LOGGER
+from .image_loader import MyImage, read_from_file_list
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class ImageStack(object):
+    """The images in one contiguous (n, height, width, 3) uint8 array,
+    with the parallel table of the img_id and tag.
+
+    The playback walks the integer index schedule of the stack,
+    so the rotation costs nothing and the neighbouring key frames
+    are the neighbouring rows of the stack.
+    """
+
+    def __init__(self, stack, ids, tags):
+        """Init the stack.
+
+        Args:
+            stack (np.Array): The uint8 images, the shape is (n, height, width, 3).
+            ids (list): The img_id of the images.
+            tags (list): The tag of the images.
+        """
+        assert len(stack) == len(ids) == len(tags), 'The stack and the table mismatch'
+
+        self.stack = stack
+        self.ids = list(ids)
+        self.tags = list(tags)
+
+    def __len__(self):
+        return len(self.stack)
+
+    @property
+    def shape(self):
+        """The shape of the image, (height, width, 3)."""
+        return self.stack.shape[1:]
+
+    @property
+    def tag_table(self):
+        """The tag table of the img_id."""
+        return dict(zip(self.ids, self.tags))
+
+    def schedule(self, key_frames, start=0):
+        """The index schedule of the key frames.
+
+        It is the index version of the toolbox.pop rotation,
+        the k-th key frame is the (start + k) % n image.
+
+        Args:
+            key_frames (int): The number of the key frames.
+            start (int, optional): The index of the first key frame. Defaults to 0.
+
+        Returns:
+            np.Array: The int index of the key frames, the shape is (key_frames, ).
+        """
+        return (np.arange(key_frames) + start) % len(self)
+
+    @classmethod
+    def from_images(cls, images):
+        """Build the stack from the images, the images are copied.
+
+        Args:
+            images (list): The loaded images in the object of MyImage.
+
+        Returns:
+            ImageStack: The stack.
+        """
+        stack = np.stack([e.get('bgr') for e in images])
+        return cls(stack, [e.img_id for e in images], [e.tag for e in images])
+
+    def save(self, path):
+        """Save the stack into the .npy file, the table is saved aside in .json.
+
+        Args:
+            path (Path): The path of the .npy file.
+        """
+        path = Path(path)
+        np.save(path, self.stack)
+        path.with_suffix('.json').write_text(json.dumps(dict(
+            ids=self.ids, tags=self.tags), indent=2))
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """Load the stack from the .npy file.
+
+        Args:
+            path (Path): The path of the .npy file.
+            mmap_mode (str, optional): The mmap_mode of the np.load. Defaults to 'r'.
+
+        Returns:
+            ImageStack: The stack.
+        """
+        path = Path(path)
+        table = json.loads(path.with_suffix('.json').read_text())
+        return cls(np.load(path, mmap_mode=mmap_mode), table['ids'], table['tags'])
+
+
+def read_stack_from_file_list(file_list, workers=8, max_in_flight=32, cache=None):
+    """Read the images from the file_list into the contiguous stack.
+
+    The images are copied into the preallocated stack once they are loaded,
+    so the separate arrays are released during the loading.
+    The failed images are removed from the stack.
+
+    Args:
+        file_list (list): The file_list of (path, img_id, tag).
+        workers (int, optional): The number of the decoding threads. Defaults to 8.
+        max_in_flight (int, optional): The max number of the submitted files. Defaults to 32.
+        cache (DecodedImageCache, optional): The decoded image cache. Defaults to None, refers no cache.
+
+    Returns:
+        ImageStack: The stack.
+    """
+    width, height = MyImage.image_size
+    stack = np.empty((len(file_list), height, width, 3), dtype=np.uint8)
+    loaded = np.zeros(len(file_list), dtype=bool)
+
+    def on_loaded(idx, my_img):
+        stack[idx] = my_img.bgr
+        my_img.bgr = None
+        loaded[idx] = True
+
+    read_from_file_list(file_list, workers=workers,
+                        max_in_flight=max_in_flight, cache=cache,
+                        on_loaded=on_loaded)
+
+    if not loaded.all():
+        stack = stack[loaded]
+
+    ids = [e[1] for e, flag in zip(file_list, loaded) if flag]
+    tags = [e[2] for e, flag in zip(file_list, loaded) if flag]
+
+    LOGGER.debug('Read {} | {} images into the stack of {} bytes'.format(
+        len(stack), len(file_list), stack.nbytes))
+
+    return ImageStack(stack, ids, tags)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
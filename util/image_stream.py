@@ -0,0 +1,135 @@
+"""
+File: image_stream.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Streaming image loading with a bounded look-ahead window
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import collections
+
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from .logger import LOGGER
+from .image_loader import load_local_cached
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class StreamingImageLoader(object):
+    """The streaming loader of the images in the file_list.
+
+    The images are decoded just ahead of the consumption,
+    at most the window images are decoded or being decoded,
+    so the memory is bounded by the window, not by the file_list.
+
+    The file_list is cycled as the toolbox.pop rotation does,
+    the failed files are logged and skipped.
+    """
+
+    def __init__(self, file_list, window=16, workers=4, cache=None):
+        """Init the loader, the decoding starts at once.
+
+        Args:
+            file_list (list): The file_list of (path, img_id, tag).
+            window (int, optional): The look-ahead window of the images. Defaults to 16.
+            workers (int, optional): The number of the decoding threads. Defaults to 4.
+            cache (DecodedImageCache, optional): The decoded image cache. Defaults to None, refers no cache.
+        """
+        assert len(file_list) > 0, 'The file_list is empty'
+
+        self.file_list = file_list
+        self.window = max(window, 1)
+        self.cache = cache
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.futures = collections.deque()
+        self.cursor = 0
+        self.failures = 0
+
+        self.tag_table = dict()
+        for path, img_id, tag in file_list:
+            self.tag_table[img_id] = tag
+
+        self._fill()
+        self.current = self._take()
+        self.shape = self.current.get('bgr').shape
+
+        LOGGER.debug('Streaming {} images with look-ahead window {}'.format(
+            len(file_list), self.window))
+
+    def __len__(self):
+        return len(self.file_list)
+
+    def _fill(self):
+        """Submit the files until the window is full."""
+        while len(self.futures) < self.window:
+            path, img_id, tag = self.file_list[self.cursor % len(self.file_list)]
+            self.cursor += 1
+            self.futures.append((path, tag, self.executor.submit(
+                load_local_cached, Path(path), img_id, self.cache)))
+
+    def _take(self):
+        """Take the next decoded image, the failed files are skipped.
+
+        Returns:
+            MyImage: The image.
+        """
+        for _ in range(len(self.file_list)):
+            path, tag, future = self.futures.popleft()
+            self._fill()
+
+            try:
+                my_img = future.result()
+                my_img.tag = tag
+                return my_img
+            except Exception as err:
+                self.failures += 1
+                LOGGER.error('Can not load image {}: {}'.format(path, err))
+
+        raise RuntimeError('Can not load any image from the file_list')
+
+    def next_pair(self):
+        """Get the next pair of the key frames.
+
+        It is the streaming version of the toolbox.pop rotation,
+        the k-th pair is (image_k, image_k+1).
+
+        Returns:
+            image (MyImage): The key frame, it fades out;
+            next_image (MyImage): The next key frame, it fades in.
+        """
+        image = self.current
+        self.current = self._take()
+        return image, self.current
+
+    def close(self):
+        """Stop the decoding threads."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.futures.clear()
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -24,97 +24,120 @@ in this module. That API assumes you only ever want to use a single
 parallel port at once.
 """
 import sys
+import logging
 
-# To make life easier, only try drivers which have a hope in heck of working.
-# Because hasattr() in connection to windll ends up in an OSError trying to
-# load 32bit drivers in a 64bit environment, different drivers defined in
-# the dictionary 'drivers' are tested.
-
-if sys.platform.startswith('linux'):
-    from ._linux import PParallelLinux
-    ParallelPort = PParallelLinux
-elif sys.platform == 'win32':
-    drivers = dict(inpout32=('_inpout', 'PParallelInpOut'),
-                   inpoutx64=('_inpout', 'PParallelInpOut'),
-                   dlportio=('_dlportio', 'PParallelDLPortIO'))
-    from ctypes import windll
-    from importlib import import_module
-    for key, val in drivers.items():
-        driver_name, class_name = val
-        try:
-            hasattr(windll, key)
-            ParallelPort = getattr(import_module('.'+driver_name, __name__),
-                                   class_name)
-            break
-        except (OSError, KeyError, NameError):
-            ParallelPort = None
-            continue
-    if ParallelPort is None:
-        print("psychopy.parallel has been imported but no "
-              "parallel port driver found. Install either "
-              "inpout32, inpoutx64 or dlportio")
-else:
-    logging.warning("psychopy.parallel has been imported on a Mac "
-                    "(which doesn't have a parallel port?)")
+from importlib import import_module
+
+# The drivers are imported when the port is created, not when this module is
+# imported, so the module is importable on the machines without any driver.
+# The backends are the (module, class) of the drivers.
+BACKENDS = dict(linux=('_linux', 'PParallelLinux'),
+                inpout32=('_inpout', 'PParallelInpOut'),
+                inpoutx64=('_inpout', 'PParallelInpOut'),
+                dlportio=('_dlportio', 'PParallelDLPortIO'),
+                simulated=('_simulated', 'PParallelSimulated'))
+
+
+# macOS doesn't have a parallel port but write the class for doc purps
+class PParallelUnavailable:
+    """Class for read/write access to the parallel port on Windows & Linux
 
-    # macOS doesn't have a parallel port but write the class for doc purps
-    class ParallelPort:
-        """Class for read/write access to the parallel port on Windows & Linux
+    Usage::
+
+        from psychopy import parallel
+        port = parallel.ParallelPort(address=0x0378)
+
+        port.setData(4)
+        port.readPin(2)
+        port.setPin(2, 1)
+    """
+
+    def __init__(self, address):
+        """This is just a dummy constructor to avoid errors
+        when the parallel port cannot be initiated
+        """
+        msg = ("psychopy.parallel has been imported but (1) no parallel "
+               "port driver could be found or accessed on Windows or "
+               "(2) PsychoPy is run on a Mac (without parallel-port "
+               "support for now)")
+        logging.warning(msg)
 
-        Usage::
+    def setData(self, data):
+        """Set the data to be presented on the parallel port (one ubyte).
+        Alternatively you can set the value of each pin (data pins are
+        pins 2-9 inclusive) using :func:`~psychopy.parallel.setPin`
+
+        Examples::
 
             from psychopy import parallel
             port = parallel.ParallelPort(address=0x0378)
 
-            port.setData(4)
-            port.readPin(2)
-            port.setPin(2, 1)
-        """
+            port.setData(0)  # sets all pins low
+            port.setData(255)  # sets all pins high
+            port.setData(2)  # sets just pin 3 high (pin2 = bit0)
+            port.setData(3)  # sets just pins 2 and 3 high
 
-        def __init__(self, address):
-            """This is just a dummy constructor to avoid errors
-            when the parallel port cannot be initiated
-            """
-            msg = ("psychopy.parallel has been imported but (1) no parallel "
-                   "port driver could be found or accessed on Windows or "
-                   "(2) PsychoPy is run on a Mac (without parallel-port "
-                   "support for now)")
-            logging.warning(msg)
+        You can also convert base 2 to int easily in python::
 
-        def setData(self, data):
-            """Set the data to be presented on the parallel port (one ubyte).
-            Alternatively you can set the value of each pin (data pins are
-            pins 2-9 inclusive) using :func:`~psychopy.parallel.setPin`
+            port.setData( int("00000011", 2) )  # pins 2 and 3 high
+            port.setData( int("00000101", 2) )  # pins 2 and 4 high
+        """
+        sys.stdout.flush()
+        raise NotImplementedError("Parallel ports don't work on a Mac")
+
+    def readData(self):
+        """Return the value currently set on the data pins (2-9)
+        """
+        raise NotImplementedError("Parallel ports don't work on a Mac")
 
-            Examples::
+    def readPin(self, pinNumber):
+        """Determine whether a desired (input) pin is high(1) or low(0).
 
-                from psychopy import parallel
-                port = parallel.ParallelPort(address=0x0378)
+        Pins 2-13 and 15 are currently read here
+        """
+        raise NotImplementedError("Parallel ports don't work on a Mac")
 
-                port.setData(0)  # sets all pins low
-                port.setData(255)  # sets all pins high
-                port.setData(2)  # sets just pin 3 high (pin2 = bit0)
-                port.setData(3)  # sets just pins 2 and 3 high
 
-            You can also convert base 2 to int easily in python::
+def getPortClass(backend='auto'):
+    """Return the parallel port class of the backend
 
-                port.setData( int("00000011", 2) )  # pins 2 and 3 high
-                port.setData( int("00000101", 2) )  # pins 2 and 4 high
-            """
-            sys.stdout.flush()
-            raise NotImplementedError("Parallel ports don't work on a Mac")
+    The 'auto' backend tries the drivers which have a hope in heck of
+    working on the platform, the others are the keys of the BACKENDS.
+    """
+    if backend != 'auto':
+        driver_name, class_name = BACKENDS[backend]
+        return getattr(import_module('.' + driver_name, __name__), class_name)
+
+    # To make life easier, only try drivers which have a hope in heck of working.
+    # Because hasattr() in connection to windll ends up in an OSError trying to
+    # load 32bit drivers in a 64bit environment, the windows drivers of the
+    # BACKENDS are tested in order.
+    if sys.platform.startswith('linux'):
+        return getPortClass('linux')
+    elif sys.platform == 'win32':
+        from ctypes import windll
+        for key in ('inpout32', 'inpoutx64', 'dlportio'):
+            try:
+                hasattr(windll, key)
+                return getPortClass(key)
+            except (OSError, KeyError, NameError):
+                continue
+        print("psychopy.parallel has been imported but no "
+              "parallel port driver found. Install either "
+              "inpout32, inpoutx64 or dlportio")
+        return PParallelUnavailable
+    else:
+        logging.warning("psychopy.parallel has been imported on a Mac "
+                        "(which doesn't have a parallel port?)")
+        return PParallelUnavailable
 
-        def readData(self):
-            """Return the value currently set on the data pins (2-9)
-            """
-            raise NotImplementedError("Parallel ports don't work on a Mac")
 
-        def readPin(self, pinNumber):
-            """Determine whether a desired (input) pin is high(1) or low(0).
+def __getattr__(name):
+    # The ParallelPort is resolved lazily for the API compatibility
+    if name == 'ParallelPort':
+        return getPortClass()
+    raise AttributeError(name)
 
-            Pins 2-13 and 15 are currently read here
-            """
-            raise NotImplementedError("Parallel ports don't work on a Mac")
 
 # In order to maintain API compatibility, we have to manage
 # the old, non-object-based, calls.  This necessitates keeping a
@@ -123,7 +146,7 @@ else:
 PORT = None  # don't create a port until necessary
 
 
-def setPortAddress(address=0x0378):
+def setPortAddress(address=0x0378, backend='auto'):
     """Set the memory address or device node for your parallel port
     of your parallel port, to be used in subsequent commands
 
@@ -137,7 +160,7 @@ def setPortAddress(address=0x0378):
         /dev/parport0
 
     This routine will attempt to find a usable driver depending
-    on your platform
+    on your platform, or use the driver of the backend, refers BACKENDS
     """
 
     global PORT
@@ -153,7 +176,7 @@ def setPortAddress(address=0x0378):
         del PORT
 
     try:
-        PORT = ParallelPort(address=address)
+        PORT = getPortClass(backend)(address=address)
     except Exception as exp:
         # logging.warning('Could not initiate port: %s' % str(exp))
         PORT = None
@@ -11,6 +11,30 @@
 
 # We duck-type the parallel port objects
 
+# The bits of the status pins in the PPRSTATUS register,
+# and whether the pin is inverted by the hardware,
+# as the getIn* methods of the pyparallel
+STATUS_BITS = {
+    10: (0x40, False),  # acknowledge
+    11: (0x80, True),  # busy
+    12: (0x20, False),  # paper out
+    13: (0x10, False),  # selected
+    15: (0x08, False),  # error
+}
+
+
+def status_pins(status):
+    """Decode the status register into the states of the status pins.
+
+    Args:
+        status (int): The value of the PPRSTATUS register.
+
+    Returns:
+        dict: The states of the status pins, {pinNumber: 0 or 1}.
+    """
+    return {pin: int(bool(status & bit) != inverted)
+            for pin, (bit, inverted) in STATUS_BITS.items()}
+
 
 class PParallelLinux:
     """This class provides read/write access to the parallel port for linux
@@ -22,7 +46,7 @@ class PParallelLinux:
         sudo modprobe ppdev
     """
 
-    def __init__(self, address='/dev/parport0'):
+    def __init__(self, address='/dev/parport0', port=None):
         """Set the device node of your parallel port
 
         Common port addresses::
@@ -30,17 +54,28 @@ class PParallelLinux:
             LPT1 = /dev/parport0
             LPT2 = /dev/parport1
             LPT3 = /dev/parport2
+
+        The port is the opened pyparallel port, it is for injecting
+        the fake device in the tests. Defaults to None,
+        refers opening the address with pyparallel.
         """
-        import parallel as pyp
+        if port is None:
+            import parallel as pyp
+
+            if not hasattr(pyp, 'Parallel'):
+                # We failed to import pyparallel properly
+                # We probably ended up with psychopy.parallel instead...
+                raise Exception('Failed to import pyparallel - is it installed?')
 
-        if not hasattr(pyp, 'Parallel'):
-            # We failed to import pyparallel properly
-            # We probably ended up with psychopy.parallel instead...
-            raise Exception('Failed to import pyparallel - is it installed?')
+            port = pyp.Parallel(address)
 
-        self.port = pyp.Parallel(address)
+        self.port = port
         self.status = None
 
+        # The shadow of the data register,
+        # it is read once here and kept by every write.
+        self.data = self.port.PPRDATA()
+
     def __del__(self):
         if hasattr(self, 'port'):
             del self.port
@@ -63,6 +98,21 @@ class PParallelLinux:
             parallel.setData(int("00000101", 2))  # pins 2 and 4 high
         """
         self.port.setData(data)
+        self.data = data
+
+    def setPins(self, mask, value):
+        """Set the pins of the mask to the bits of the value at once,
+        the other pins are kept. It costs one ioctl write.
+
+        Examples::
+
+            p.setPins(0b00000011, 0b00000001)  # pin 2 high and pin 3 low
+
+        Args:
+            mask (int): The mask of the data pins, bit0 refers pin2.
+            value (int): The value of the masked pins.
+        """
+        self.setData((self.data & ~mask | value & mask) & 0xFF)
 
     def setPin(self, pinNumber, state):
         """Set a desired pin to be high(1) or low(0).
@@ -72,34 +122,36 @@ class PParallelLinux:
             p.setPin(3, 1)  # sets pin 3 high
             p.setPin(3, 0)  # sets pin 3 low
         """
-        # I can't see how to do this without reading and writing the data
-        if state:
-            self.port.setData(self.port.PPRDATA() | (2**(pinNumber - 2)))
-        else:
-            self.port.setData(self.port.PPRDATA() & (255 ^ 2**(pinNumber - 2)))
+        bit = 2**(pinNumber - 2)
+        self.setPins(bit, bit if state else 0)
 
-    def readData(self):
-        """Return the value currently set on the data pins (2-9)
+    def readData(self, refresh=False):
+        """Return the value currently set on the data pins (2-9),
+        it is the shadow unless refresh is True.
         """
-        return self.port.PPRDATA()
+        if refresh:
+            self.data = self.port.PPRDATA()
+        return self.data
+
+    def readStatus(self):
+        """Read the status pins (10-13 and 15) at once by one ioctl.
+
+        Returns:
+            dict: The states of the status pins, {pinNumber: 0 or 1}.
+        """
+        return status_pins(self.port.PPRSTATUS())
 
     def readPin(self, pinNumber):
         """Determine whether a desired (input) pin is high(1) or low(0).
 
-        Pins 2-13 and 15 are currently read here
+        Pins 2-13 and 15 are currently read here,
+        the data pins (2-9) are read from the shadow.
         """
-        if pinNumber == 10:
-            return self.port.getInAcknowledge()
-        elif pinNumber == 11:
-            return self.port.getInBusy()
-        elif pinNumber == 12:
-            return self.port.getInPaperOut()
-        elif pinNumber == 13:
-            return self.port.getInSelected()
-        elif pinNumber == 15:
-            return self.port.getInError()
+        if pinNumber in STATUS_BITS:
+            return self.readStatus()[pinNumber]
         elif 2 <= pinNumber <= 9:
-            return (self.port.PPRDATA() >> (pinNumber - 2)) & 1
+            return (self.data >> (pinNumber - 2)) & 1
         else:
             msg = 'Pin %i cannot be read (by PParallelLinux.readPin())'
             print(msg % pinNumber)
+
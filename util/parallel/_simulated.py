@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# The simulated parallel port works without any driver or device,
+# it is for the machines without the parallel port and for the latency test.
+
+# We duck-type the parallel port objects
+
+import time
+import threading
+
+import numpy as np
+
+
+class PParallelSimulated:
+    """This class simulates the parallel port in the memory.
+
+    Every write of the data register is recorded into the ring of the
+    (perf_counter_ns, value) edges, so the written codes and their timing
+    can be checked afterwards, refers edges().
+
+    The data pins (2-9) are looped back to the reading,
+    the status pins are the simulated status register.
+    """
+
+    def __init__(self, address=None, capacity=65536):
+        """Init the simulated port
+
+        The address is kept for the compatibility, it is not used.
+        """
+        self.address = address
+        self.data = 0
+        self.status = 0
+
+        self.lock = threading.Lock()
+        self.times = np.zeros(capacity, dtype=np.int64)
+        self.values = np.zeros(capacity, dtype=np.uint8)
+        self.count = 0
+
+    def setData(self, data):
+        """Set the data to be presented on the parallel port (one ubyte),
+        the edge is recorded with the perf_counter_ns.
+        """
+        t = time.perf_counter_ns()
+        with self.lock:
+            idx = self.count % len(self.times)
+            self.times[idx] = t
+            self.values[idx] = data
+            self.count += 1
+            self.data = data
+
+    def setPin(self, pinNumber, state):
+        """Set a desired pin to be high(1) or low(0).
+        """
+        if state:
+            self.setData(self.data | (2**(pinNumber - 2)))
+        else:
+            self.setData(self.data & (255 ^ 2**(pinNumber - 2)))
+
+    def readData(self):
+        """Return the value currently set on the data pins (2-9)
+        """
+        return self.data
+
+    def readPin(self, pinNumber):
+        """Determine whether a desired (input) pin is high(1) or low(0).
+
+        Pins 2-13 and 15 are read, the pins 10-13 and 15 are the bits
+        of the simulated status register in the order of
+        acknowledge, busy, paper out, selected and error.
+        """
+        if 2 <= pinNumber <= 9:
+            return (self.data >> (pinNumber - 2)) & 1
+
+        status_bits = {10: 0, 11: 1, 12: 2, 13: 3, 15: 4}
+        if pinNumber in status_bits:
+            return (self.status >> status_bits[pinNumber]) & 1
+
+        msg = 'Pin %i cannot be read (by PParallelSimulated.readPin())'
+        print(msg % pinNumber)
+
+    def edges(self):
+        """Return the recorded edges in the order of the writing.
+
+        Returns:
+            times (np.Array): The perf_counter_ns of the edges;
+            values (np.Array): The written values.
+        """
+        with self.lock:
+            begin = max(0, self.count - len(self.times))
+            idx = np.arange(begin, self.count) % len(self.times)
+            return self.times[idx], self.values[idx]
+
+    def dropped(self):
+        """Return the number of the edges overwritten in the ring.
+        """
+        return max(0, self.count - len(self.times))
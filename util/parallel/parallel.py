@@ -1,59 +1,303 @@
 # %%
 import time
 import threading
+import collections
+import numpy as np
 
-from . import setPortAddress, setData
+from . import getPortClass
 
 # %%
+# The record of the sent pulse, the *_ns are the perf_counter_ns,
+# the rise_ns and fall_ns are right after the setData edges.
+EDGE_DTYPE = np.dtype([
+    ('code', '<i4'),
+    ('enqueue_ns', '<i8'),
+    ('rise_ns', '<i8'),
+    ('fall_ns', '<i8'),
+])
+
+
+def wait_until_ns(deadline_ns, spin_margin_ns=500000):
+    """Wait until the deadline with the coarse sleep and the fine spin.
+
+    Args:
+        deadline_ns (int): The deadline in perf_counter_ns.
+        spin_margin_ns (int, optional): The busy spin before the deadline. Defaults to 500000.
+
+    Returns:
+        int: The perf_counter_ns when it returns.
+    """
+    remaining = deadline_ns - spin_margin_ns - time.perf_counter_ns()
+    if remaining > 0:
+        time.sleep(remaining / 1e9)
+
+    now = time.perf_counter_ns()
+    while now < deadline_ns:
+        now = time.perf_counter_ns()
+    return now
+
 
 # %%
 
 
 class Parallel(object):
-    def __init__(self):
+    """The trigger dispatcher of the parallel port.
+
+    The codes are sent by the dispatcher thread in the strict FIFO order,
+    every code is one pulse of the pulse_width,
+    and the pulses are separated by at least the min_gap.
+    The dispatcher sleeps on the condition until the code is sent,
+    so it wakes at once and costs nothing when it is idle.
+
+    The edges of every pulse are timestamped with the perf_counter_ns,
+    refers EDGE_DTYPE.
+
+    The port is the driver of the backend, it is loaded by reset(),
+    the 'simulated' backend works without the parallel port.
+
+    The send_inline() writes the rising edge in the calling thread at once,
+    it is for sending right after the frame is presented,
+    and the falling edge is left to the dispatcher.
+    The busy flag reserves the port, it keeps the pulses from overlapping,
+    and the condition is only held to check and set the flag.
+    """
+
+    def __init__(self, pulse_width=0.001, min_gap=0.001, capacity=4096):
+        """Init the dispatcher, it starts by reset().
+
+        Args:
+            pulse_width (float, optional): The width of the pulse in seconds. Defaults to 0.001.
+            min_gap (float, optional): The min gap between the pulses in seconds. Defaults to 0.001.
+            capacity (int, optional): The number of the kept edges records. Defaults to 4096.
+        """
         self.address = None
-        self.buffer = []
+        self.port = None
+        self.buffer = collections.deque()
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.busy = False
+
+        self.pulse_width_ns = int(pulse_width * 1e9)
+        self.min_gap_ns = int(min_gap * 1e9)
+
+        # The ring of the edges records
+        self.edges = np.zeros(capacity, dtype=EDGE_DTYPE)
+        self.sent = 0
+        self.last_fall_ns = 0
         pass
 
-    def reset(self, address):
+    def reset(self, address, backend='auto'):
+        """Open the port and start the dispatcher.
+
+        Args:
+            address (str): The address of the port, the hex string is converted into the int, like 'CEFC', the device node is used as it is, like '/dev/parport0'.
+            backend (str, optional): The backend of the port, 'auto' refers the driver of the platform, refers util.parallel.BACKENDS. Defaults to 'auto'.
+        """
         self.address = address
-        address_hex = int(address, 16)
-        setPortAddress(address_hex)
-        setData(0)
+
+        try:
+            address = int(address, 16)
+        except (TypeError, ValueError):
+            pass
+
+        self.port = getPortClass(backend)(address=address)
+        self.port.setData(0)
         self.run_forever()
 
+    def _ready(self):
+        """Whether the head of the buffer is ready to be sent, it is called with the condition.
+        The falling edge of the inline pulse is always ready,
+        the code waits until the port is not busy.
+        """
+        if not self.buffer:
+            return False
+        return self.buffer[0][3] is not None or not self.busy
+
     def sending_loop(self):
         while True:
-            self._send(verbose=True)
-            time.sleep(0.001)
+            with self.condition:
+                while not self._ready() and (self.running or self.buffer):
+                    self.condition.wait()
+
+                if not self.buffer:
+                    return
+
+                value, enqueue_ns, verbose, rise_ns = self.buffer.popleft()
+                if rise_ns is None:
+                    self.busy = True
+
+            if rise_ns is None:
+                self._send(value, enqueue_ns, verbose)
+            else:
+                self._fall(value, enqueue_ns, verbose, rise_ns)
+
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
 
     def run_forever(self):
-        t = threading.Thread(target=self.sending_loop, daemon=True)
-        t.start()
+        if self.thread is not None:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self.sending_loop, daemon=True)
+        self.thread.start()
 
     def send(self, value, verbose=True):
-        self.buffer.append(value)
+        """Queue the code, the dispatcher is woken at once.
+
+        Args:
+            value (int): The code.
+            verbose (bool, optional): Whether print the sent code. Defaults to True.
 
-        # t = threading.Thread(target=self._send, args=(verbose,), daemon=True)
-        # t.start()
+        Returns:
+            float: The time of the queueing.
+        """
+        with self.condition:
+            self.buffer.append((value, time.perf_counter_ns(), verbose, None))
+            self.condition.notify()
 
         return time.time()
 
-    def _send(self, verbose):
-        n = len(self.buffer)
-        buffer = set([self.buffer.pop(0) for _ in range(n)])
+    def send_inline(self, value, at_ns=None, verbose=False):
+        """Write the rising edge of the code in the calling thread,
+        the falling edge is written by the dispatcher after the pulse_width.
+
+        It waits if the pulse of the dispatcher is on, and keeps the min gap from the last pulse.
+
+        Args:
+            value (int): The code.
+            at_ns (int, optional): The perf_counter_ns of the writing. Defaults to None, refers at once.
+            verbose (bool, optional): Whether print the sent code. Defaults to False.
+
+        Returns:
+            int: The perf_counter_ns of the rising edge, -1 refers the Parallel is not set.
+        """
+        if self.port is None or self.thread is None:
+            return -1
 
-        value = sum(buffer)
+        enqueue_ns = time.perf_counter_ns()
 
+        # Reserve the port, the dispatcher holds the queued codes while it is busy,
+        # and the lock is released during the waiting, so the send() is never blocked.
+        with self.condition:
+            while self.busy:
+                self.condition.wait()
+            self.busy = True
+            deadline_ns = max(at_ns or 0, self.last_fall_ns + self.min_gap_ns)
+
+        wait_until_ns(deadline_ns)
+        self.port.setData(value)
+        rise_ns = time.perf_counter_ns()
+
+        # The falling edge is the next to be sent
+        with self.condition:
+            self.buffer.appendleft((value, enqueue_ns, verbose, rise_ns))
+            self.condition.notify()
+
+        return rise_ns
+
+    def _fall(self, value, enqueue_ns, verbose, rise_ns):
+        """Write the falling edge of the inline pulse, in the dispatcher thread.
+
+        Args:
+            value (int): The code.
+            enqueue_ns (int): The perf_counter_ns of the calling.
+            verbose (bool): Whether print the sent code.
+            rise_ns (int): The perf_counter_ns of the rising edge.
+        """
+        wait_until_ns(rise_ns + self.pulse_width_ns)
+
+        self.port.setData(0)
+        self._record(value, enqueue_ns, rise_ns, time.perf_counter_ns())
+
+        if verbose:
+            print('Sent inline: {} to {}'.format(value, self.address))
+
+    def _send(self, value, enqueue_ns, verbose):
+        """Send the pulse of the value, in the dispatcher thread.
+
+        Args:
+            value (int): The code.
+            enqueue_ns (int): The perf_counter_ns of the queueing.
+            verbose (bool): Whether print the sent code.
+        """
         if value == 0:
             return
 
-        if self.address is None:
+        if self.port is None:
             print('Send failed since the Parallel is not set')
-        else:
-            setData(value)
-            time.sleep(0.001)
-            setData(0)
+            return
+
+        # Keep the min gap from the last pulse
+        wait_until_ns(self.last_fall_ns + self.min_gap_ns)
+
+        self.port.setData(value)
+        rise_ns = time.perf_counter_ns()
+
+        wait_until_ns(rise_ns + self.pulse_width_ns)
+
+        self.port.setData(0)
+        self._record(value, enqueue_ns, rise_ns, time.perf_counter_ns())
 
         if verbose:
             print('Sent: {} to {}'.format(value, self.address))
+
+    def _record(self, value, enqueue_ns, rise_ns, fall_ns):
+        """Record the edges of the pulse."""
+        self.last_fall_ns = fall_ns
+
+        edge = self.edges[self.sent % len(self.edges)]
+        edge['code'] = value
+        edge['enqueue_ns'] = enqueue_ns
+        edge['rise_ns'] = rise_ns
+        edge['fall_ns'] = fall_ns
+        self.sent += 1
+
+    def sent_edges(self):
+        """The kept edges records in the order of the sending.
+
+        Returns:
+            np.Array: The records in EDGE_DTYPE.
+        """
+        begin = max(0, self.sent - len(self.edges))
+        idx = np.arange(begin, self.sent) % len(self.edges)
+        return self.edges[idx]
+
+    def report(self):
+        """Report the latency from the queueing to the rising edge, and the pulse width.
+
+        Returns:
+            dict: The report, the times are in milliseconds.
+        """
+        edges = self.sent_edges()
+        report = dict(sent=self.sent, queued=len(self.buffer))
+
+        if len(edges) > 0:
+            latency = (edges['rise_ns'] - edges['enqueue_ns']) / 1e6
+            width = (edges['fall_ns'] - edges['rise_ns']) / 1e6
+            report.update(
+                latency_mean_ms=float(latency.mean()),
+                latency_max_ms=float(latency.max()),
+                width_mean_ms=float(width.mean()),
+                width_max_ms=float(width.max()),
+            )
+
+        return report
+
+    def close(self, timeout=1.0):
+        """Stop the dispatcher after the queued codes are sent.
+
+        Args:
+            timeout (float, optional): The timeout of the joining in seconds. Defaults to 1.0.
+        """
+        if self.thread is None:
+            return
+
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+        self.thread.join(timeout)
+        self.thread = None
@@ -0,0 +1,548 @@
+"""
+File: presenter.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Pluggable display presenters, the cv2 window and the vsync-locked OpenGL
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import cv2
+import time
+import zlib
+import collections
+import numpy as np
+
+from pathlib import Path
+
+from .logger import LOGGER
+
+# The full screen quad, the image row 0 is on the top of the screen
+GL_VERTEX_SHADER = '''
+#version 330
+in vec2 in_pos;
+out vec2 uv;
+void main() {
+    uv = vec2((in_pos.x + 1.0) * 0.5, (1.0 - in_pos.y) * 0.5);
+    gl_Position = vec4(in_pos, 0.0, 1.0);
+}
+'''
+
+GL_FRAGMENT_SHADER = '''
+#version 330
+uniform sampler2D frame;
+in vec2 uv;
+out vec4 color;
+void main() {
+    color = vec4(texture(frame, uv).rgb, 1.0);
+}
+'''
+
+# The crossfade of the two key frames,
+# the marker is the (x, y, width, height) rect of the frame with the gray value,
+# the negative marker_value refers no marker.
+GL_BLEND_FRAGMENT_SHADER = '''
+#version 330
+uniform sampler2D key_a;
+uniform sampler2D key_b;
+uniform float alpha;
+uniform vec4 marker;
+uniform float marker_value;
+uniform float height;
+in vec2 uv;
+out vec4 color;
+void main() {
+    vec3 c = mix(texture(key_a, uv).rgb, texture(key_b, uv).rgb, alpha);
+    vec2 p = vec2(gl_FragCoord.x, height - gl_FragCoord.y);
+    if (marker_value >= 0.0 &&
+        p.x >= marker.x && p.x < marker.x + marker.z &&
+        p.y >= marker.y && p.y < marker.y + marker.w) {
+        c = vec3(marker_value);
+    }
+    color = vec4(c, 1.0);
+}
+'''
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class Presenter(object):
+    """The base class of the presenters.
+
+    The presenter owns the full screen surface,
+    it presents the BGR uint8 frames in the size of the image_rect,
+    and returns the perf_counter_ns when the frame is presented.
+
+    The presenter also crossfades between the two latest key frames,
+    the key frames are pushed once by push_key(),
+    and every interpolated frame is presented by present_blend(),
+    so the interpolated frames are never built by the buffer.
+    The base class blends on the CPU, the GL presenter blends in the shader.
+    """
+
+    name = 'base'
+
+    def __init__(self, winname):
+        self.winname = winname
+
+        # The rect of the surface, (x, y, width, height)
+        self.image_rect = None
+
+        # The two key frames and the blended frame of the CPU crossfade,
+        # the key_b indexes the newer key frame.
+        self.keys = None
+        self.key_b = 0
+        self.blended = None
+
+    def open(self):
+        """Open the full screen surface.
+
+        Returns:
+            tuple: The image_rect, (x, y, width, height).
+        """
+        raise NotImplementedError
+
+    def present(self, frame):
+        """Present the frame.
+
+        Args:
+            frame (np.Array): The BGR uint8 frame, the shape is (height, width, 3).
+
+        Returns:
+            int: The perf_counter_ns when the frame is presented.
+        """
+        raise NotImplementedError
+
+    def push_key(self, frame):
+        """Push the key frame, it becomes the newer key frame of the crossfade,
+        the older one is dropped.
+
+        The frame is copied, so the caller is free to reuse it.
+
+        Args:
+            frame (np.Array): The BGR uint8 key frame, the shape is (height, width, 3).
+        """
+        if self.keys is None or self.keys[0].shape != frame.shape:
+            self.keys = [np.zeros_like(frame), np.zeros_like(frame)]
+            self.blended = np.zeros_like(frame)
+
+        self.key_b ^= 1
+        np.copyto(self.keys[self.key_b], frame)
+
+    def present_blend(self, alpha, marker=None):
+        """Present the crossfade of the two latest key frames.
+
+        Args:
+            alpha (float): The weight of the newer key frame, 0 refers the older key frame.
+            marker (tuple, optional): The (x, y, width, height, value) marker painted in the gray value. Defaults to None.
+
+        Returns:
+            int: The perf_counter_ns when the frame is presented.
+        """
+        key_a, key_b = self.keys[self.key_b ^ 1], self.keys[self.key_b]
+        cv2.addWeighted(key_a, 1 - alpha, key_b, alpha, 0, dst=self.blended)
+
+        if marker is not None:
+            x, y, w, h, value = marker
+            self.blended[y:y+h, x:x+w] = value
+
+        return self.present(self.blended)
+
+    def poll_key(self):
+        """Poll the key events without waiting.
+
+        Returns:
+            int: The code of the pressed key, -1 refers no key.
+        """
+        return -1
+
+    def wait_key(self, delay=0):
+        """Wait for the key press.
+
+        Args:
+            delay (int, optional): The waiting in milliseconds. Defaults to 0, refers forever.
+
+        Returns:
+            int: The code of the pressed key, -1 refers no key.
+        """
+        return -1
+
+    def close(self):
+        """Close the surface."""
+        return
+
+    def report(self):
+        """Report the presenter.
+
+        Returns:
+            dict: The report.
+        """
+        return dict(presenter=self.name)
+
+
+class CV2Presenter(Presenter):
+    """The presenter of the cv2 full screen window,
+    the cv2.imshow has no vsync, the returned time is when the imshow returns.
+    """
+
+    name = 'cv2'
+
+    def open(self):
+        # Set the window to full-screen.
+        cv2.namedWindow(self.winname, cv2.WND_PROP_FULLSCREEN)
+        # Set the window property to fit the full-screen, disable the top bar and something like that.
+        cv2.setWindowProperty(self.winname,
+                              cv2.WND_PROP_FULLSCREEN, cv2.WINDOW_FULLSCREEN)
+        # The window_position is (x, y, width, height)
+        self.image_rect = cv2.getWindowImageRect(self.winname)
+        return self.image_rect
+
+    def present(self, frame):
+        cv2.imshow(self.winname, frame)
+        return time.perf_counter_ns()
+
+    def poll_key(self):
+        return cv2.pollKey()
+
+    def wait_key(self, delay=0):
+        return cv2.waitKey(delay)
+
+    def close(self):
+        cv2.destroyWindow(self.winname)
+
+
+class GLPresenter(Presenter):
+    """The presenter of the OpenGL, the frame is uploaded as the texture.
+
+    In the window mode, the full screen glfw window swaps on the vsync,
+    the returned time is when the swap is finished.
+    In the headless mode, the frame is rendered into the offscreen framebuffer
+    of the standalone EGL context, it runs with the software GL.
+
+    The moderngl and glfw are imported when the presenter is opened,
+    so they are only required by the GL backend.
+    """
+
+    name = 'gl'
+
+    def __init__(self, winname, vsync=True, headless=False, size=(800, 600)):
+        """Init the presenter.
+
+        Args:
+            winname (str): The name of the window.
+            vsync (bool, optional): Whether swap on the vsync. Defaults to True.
+            headless (bool, optional): Whether render offscreen without the window. Defaults to False.
+            size (tuple, optional): The (width, height) of the offscreen framebuffer in the headless mode. Defaults to (800, 600).
+        """
+        super().__init__(winname)
+        self.vsync = vsync
+        self.headless = headless
+        self.size = size
+
+        self.ctx = None
+        self.window = None
+        self.fbo = None
+        self.key_events = collections.deque(maxlen=16)
+
+    def open(self):
+        import moderngl
+
+        if self.headless:
+            try:
+                self.ctx = moderngl.create_standalone_context(backend='egl')
+            except Exception:
+                self.ctx = moderngl.create_standalone_context()
+            width, height = self.size
+            self.fbo = self.ctx.simple_framebuffer((width, height))
+            self.fbo.use()
+        else:
+            import glfw
+
+            assert glfw.init(), 'Can not init the glfw'
+
+            monitor = glfw.get_primary_monitor()
+            mode = glfw.get_video_mode(monitor)
+            width, height = mode.size.width, mode.size.height
+
+            glfw.window_hint(glfw.CONTEXT_VERSION_MAJOR, 3)
+            glfw.window_hint(glfw.CONTEXT_VERSION_MINOR, 3)
+            glfw.window_hint(glfw.OPENGL_PROFILE, glfw.OPENGL_CORE_PROFILE)
+            glfw.window_hint(glfw.OPENGL_FORWARD_COMPAT, True)
+
+            self.window = glfw.create_window(
+                width, height, self.winname, monitor, None)
+            glfw.make_context_current(self.window)
+            glfw.swap_interval(1 if self.vsync else 0)
+            glfw.set_key_callback(self.window, self._on_key)
+
+            self.ctx = moderngl.create_context()
+
+        self.program = self.ctx.program(vertex_shader=GL_VERTEX_SHADER,
+                                        fragment_shader=GL_FRAGMENT_SHADER)
+        quad = np.array([-1, -1, 1, -1, -1, 1, 1, 1], dtype='f4')
+        self.vbo = self.ctx.buffer(quad.tobytes())
+        self.vao = self.ctx.vertex_array(
+            self.program, [(self.vbo, '2f', 'in_pos')])
+
+        self.texture = self._texture((width, height))
+        self.image_rect = (0, 0, width, height)
+
+        # The crossfade program and the two key frame textures
+        self.blend_program = self.ctx.program(vertex_shader=GL_VERTEX_SHADER,
+                                              fragment_shader=GL_BLEND_FRAGMENT_SHADER)
+        self.blend_vao = self.ctx.vertex_array(
+            self.blend_program, [(self.vbo, '2f', 'in_pos')])
+        self.blend_program['key_a'].value = 1
+        self.blend_program['key_b'].value = 2
+        self.blend_program['height'].value = height
+        self.key_textures = [self._texture((width, height)),
+                             self._texture((width, height))]
+
+        LOGGER.debug('GL presenter opened with {}, the image rect is {}'.format(
+            self.ctx.info['GL_RENDERER'], self.image_rect))
+
+        return self.image_rect
+
+    def _texture(self, size):
+        """The texture of the BGR uint8 frame."""
+        texture = self.ctx.texture(size, 3, dtype='f1', alignment=1)
+        # The frame is in the BGR order
+        texture.swizzle = 'BGR1'
+        return texture
+
+    def _on_key(self, window, key, scancode, action, mods):
+        import glfw
+        if action == glfw.PRESS:
+            self.key_events.append(key)
+
+    def _swap(self):
+        """Swap the buffers and wait until the swap is finished.
+
+        Returns:
+            int: The perf_counter_ns when the swap is finished.
+        """
+        if self.window is not None:
+            import glfw
+            glfw.swap_buffers(self.window)
+        self.ctx.finish()
+        return time.perf_counter_ns()
+
+    def present(self, frame):
+        self.texture.write(np.ascontiguousarray(frame), alignment=1)
+        self.texture.use(0)
+        self.vao.render(self.ctx.TRIANGLE_STRIP)
+        return self._swap()
+
+    def push_key(self, frame):
+        # Only the key frame is uploaded,
+        # the older texture is overwritten.
+        self.key_b ^= 1
+        self.key_textures[self.key_b].write(
+            np.ascontiguousarray(frame), alignment=1)
+
+    def present_blend(self, alpha, marker=None):
+        self.key_textures[self.key_b ^ 1].use(1)
+        self.key_textures[self.key_b].use(2)
+        self.blend_program['alpha'].value = alpha
+
+        if marker is None:
+            self.blend_program['marker_value'].value = -1.0
+        else:
+            x, y, w, h, value = marker
+            self.blend_program['marker'].value = (x, y, w, h)
+            self.blend_program['marker_value'].value = value / 255
+
+        self.blend_vao.render(self.ctx.TRIANGLE_STRIP)
+        return self._swap()
+
+    def read(self):
+        """Read the presented frame from the framebuffer.
+
+        Returns:
+            np.Array: The BGR uint8 frame, the shape is (height, width, 3).
+        """
+        fbo = self.fbo or self.ctx.screen
+        width, height = fbo.size
+        rgb = np.frombuffer(fbo.read(components=3, alignment=1),
+                            dtype=np.uint8).reshape(height, width, 3)
+        # The framebuffer row 0 is on the bottom of the screen
+        return cv2.cvtColor(rgb[::-1], cv2.COLOR_RGB2BGR)
+
+    def poll_key(self):
+        if self.window is None:
+            return -1
+
+        import glfw
+        glfw.poll_events()
+        if glfw.window_should_close(self.window):
+            return 27
+        return self.key_events.popleft() if self.key_events else -1
+
+    def wait_key(self, delay=0):
+        if self.window is None:
+            return -1
+
+        stop = time.perf_counter() + delay / 1000
+        while delay <= 0 or time.perf_counter() < stop:
+            key = self.poll_key()
+            if key != -1:
+                return key
+            time.sleep(0.001)
+        return -1
+
+    def close(self):
+        if self.ctx is not None:
+            self.ctx.release()
+            self.ctx = None
+
+        if self.window is not None:
+            import glfw
+            glfw.destroy_window(self.window)
+            glfw.terminate()
+            self.window = None
+
+
+class NullPresenter(Presenter):
+    """The presenter without the display, for the benchmarking and the regression test.
+
+    The frames are accepted without showing,
+    the present timestamps and the crc32 checksums of the frames are kept in the preallocated arrays,
+    and the frames are dumped into the folder if it is provided.
+    The key is never pressed, so the wait_key() returns at once.
+    """
+
+    name = 'null'
+
+    def __init__(self, winname, size=(800, 600), checksum_flag=True,
+                 dump_folder=None, dump_every=1, capacity=100000):
+        """Init the presenter.
+
+        Args:
+            winname (str): The name of the window, it is not used.
+            size (tuple, optional): The (width, height) of the surface. Defaults to (800, 600).
+            checksum_flag (bool, optional): Whether checksum the frames. Defaults to True.
+            dump_folder (Path, optional): The folder of the dumped frames in .png. Defaults to None, refers no dumping.
+            dump_every (int, optional): Dump every dump_every frames. Defaults to 1.
+            capacity (int, optional): The max number of the recorded frames. Defaults to 100000.
+        """
+        super().__init__(winname)
+        self.size = size
+        self.checksum_flag = checksum_flag
+        self.dump_folder = None if dump_folder is None else Path(dump_folder)
+        self.dump_every = max(dump_every, 1)
+
+        self.count = 0
+        self.present_ns = np.zeros(capacity, dtype=np.int64)
+        self.checksums = np.zeros(capacity, dtype=np.uint32)
+
+    def open(self):
+        if self.dump_folder is not None:
+            self.dump_folder.mkdir(parents=True, exist_ok=True)
+
+        width, height = self.size
+        self.image_rect = (0, 0, width, height)
+
+        LOGGER.debug('Null presenter opened, the image rect is {}'.format(
+            self.image_rect))
+
+        return self.image_rect
+
+    def present(self, frame):
+        idx = self.count
+
+        if idx < len(self.present_ns):
+            if self.checksum_flag:
+                self.checksums[idx] = zlib.crc32(
+                    np.ascontiguousarray(frame).data)
+
+            if self.dump_folder is not None and idx % self.dump_every == 0:
+                cv2.imwrite(str(self.dump_folder.joinpath(
+                    'frame-{:06d}.png'.format(idx))), frame)
+
+        present_ns = time.perf_counter_ns()
+        if idx < len(self.present_ns):
+            self.present_ns[idx] = present_ns
+
+        self.count += 1
+        return present_ns
+
+    def digest(self):
+        """The digest of the presented frames, it changes if any frame changes.
+
+        Returns:
+            str: The hex crc32 of the checksums.
+        """
+        n = min(self.count, len(self.checksums))
+        return '{:08x}'.format(zlib.crc32(self.checksums[:n].tobytes()))
+
+    def report(self):
+        """Report the presented frames.
+
+        Returns:
+            dict: The report, the intervals are in milliseconds.
+        """
+        n = min(self.count, len(self.present_ns))
+        intervals = np.diff(self.present_ns[:n]) / 1e6
+
+        report = dict(presenter=self.name, frames=self.count)
+
+        if len(intervals) > 0:
+            report.update(
+                fps=1000 / intervals.mean() if intervals.mean() > 0 else float('inf'),
+                interval_mean_ms=intervals.mean(),
+                interval_std_ms=intervals.std(),
+                interval_max_ms=intervals.max(),
+            )
+
+        if self.checksum_flag:
+            report['digest'] = self.digest()
+
+        return report
+
+
+# The presenters by the name
+PRESENTERS = dict(
+    cv2=CV2Presenter,
+    gl=GLPresenter,
+    null=NullPresenter,
+)
+
+
+def make_presenter(name, winname, **kwargs):
+    """Make the presenter by the name.
+
+    Args:
+        name (str): The name of the presenter, refers PRESENTERS.
+        winname (str): The name of the window.
+        kwargs: The options of the presenter.
+
+    Returns:
+        Presenter: The presenter, it is not opened.
+    """
+    assert name in PRESENTERS, 'Unknown presenter: {}'.format(name)
+    return PRESENTERS[name](winname, **kwargs)
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
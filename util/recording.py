@@ -0,0 +1,402 @@
+"""
+File: recording.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Preallocated time recording sink with the batched background writer,
+    the records are streamed into the session log while the session runs.
+
+    Convert the session log into the time_recording.csv by
+    python -m util.recording time_recording.bin -o time_recording.csv
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import time
+import argparse
+import threading
+import numpy as np
+import pandas as pd
+
+from pathlib import Path
+
+from .logger import LOGGER
+from .session_log import SessionLogWriter, read_session_log
+
+# The fixed-width record of the event,
+# the strings are truncated to the width on the character boundary, refers encode_text().
+# The *_ns are the perf_counter_ns timestamps of the displayed frame,
+# -1 refers not available.
+RECORD_DTYPE = np.dtype([
+    ('time', '<f8'),
+    ('event', 'u1'),
+    ('frame_idx', '<i4'),
+    ('img_id', 'S128'),
+    ('code', 'S32'),
+    ('scheduled_ns', '<i8'),
+    ('pre_imshow_ns', '<i8'),
+    ('post_imshow_ns', '<i8'),
+    ('post_pollkey_ns', '<i8'),
+    ('trigger_ns', '<i8'),
+    ('depth', '<i4'),
+])
+
+# The columns of the perf_counter_ns timestamps in the table
+TIMING_COLUMNS = dict(
+    scheduled_ns='scheduledNs',
+    pre_imshow_ns='preImshowNs',
+    post_imshow_ns='postImshowNs',
+    post_pollkey_ns='postPollKeyNs',
+    trigger_ns='triggerNs',
+)
+
+# The event codes of the recordEvent column
+EVENT_CODES = dict(
+    displayImage=1,
+    keyPress=2,
+    skippedKeyFrame=3,
+)
+
+EVENT_NAMES = {v: k for k, v in EVENT_CODES.items()}
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def encode_text(text, width):
+    """Encode the text into the utf-8 bytes of at most the width,
+    it is truncated on the character boundary.
+
+    Args:
+        text (str): The text.
+        width (int): The width in bytes.
+
+    Returns:
+        bytes: The encoded text;
+        bool: Whether the text is truncated.
+    """
+    raw = text.encode()
+    if len(raw) <= width:
+        return raw, False
+    return raw[:width].decode(errors='ignore').encode(), True
+
+
+class RecordingSink(object):
+    """The time recording sink.
+
+    The events are written into the preallocated structured array,
+    no thread is created and no row object is kept per event.
+    The array is the ring of the capacity records,
+    the background writer appends the new records to the session log in batches,
+    so the ring only needs to hold the records of one flush_interval,
+    and the records are kept on the disk if the session crashes.
+
+    Without the file, the sink keeps the records in the memory,
+    the oldest records are overwritten when the ring is full.
+    """
+
+    def __init__(self, capacity=4096, path=None, flush_interval=0.5):
+        """Init the sink.
+
+        Args:
+            capacity (int, optional): The number of the records in the ring. Defaults to 4096.
+            path (Path, optional): The session log of the records. Defaults to None, refers the memory only.
+            flush_interval (float, optional): The interval of the background writer in seconds. Defaults to 0.5.
+        """
+        self.capacity = capacity
+        self.records = np.zeros(capacity, dtype=RECORD_DTYPE)
+        self.path = None if path is None else Path(path)
+        self.flush_interval = flush_interval
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.writer = None
+        self.file = None
+
+        # The encoded strings, every string is encoded once,
+        # so the recording costs no allocation for the known strings.
+        self.encoded = {None: b''}
+        self.truncated = dict()
+
+        # The counters
+        self.count = 0
+        self.flushed = 0
+        self.dropped = 0
+
+    def rotate(self):
+        """Move the existing session log aside before it is overwritten,
+        it is renamed by its modified time, like time_recording.20230728-101500.bin.
+
+        Returns:
+            Path: The moved session log, None refers there is no session log.
+        """
+        if self.path is None or not self.path.is_file():
+            return None
+
+        stamp = time.strftime(
+            '%Y%m%d-%H%M%S', time.localtime(self.path.stat().st_mtime))
+        rotated = self.path.with_name('{}.{}{}'.format(
+            self.path.stem, stamp, self.path.suffix))
+        n = 1
+        while rotated.exists():
+            rotated = self.path.with_name('{}.{}-{}{}'.format(
+                self.path.stem, stamp, n, self.path.suffix))
+            n += 1
+
+        self.path.rename(rotated)
+        LOGGER.warning('The existing session log {} is moved to {}'.format(
+            self.path, rotated))
+
+        return rotated
+
+    def start(self, meta=None):
+        """Start the background writer,
+        the existing session log is moved aside, refers rotate().
+
+        Args:
+            meta (dict, optional): The extra meta information in the header of the session log. Defaults to None.
+        """
+        if self.path is None:
+            return
+
+        self.rotate()
+        self.file = SessionLogWriter(
+            self.path, RECORD_DTYPE, meta=dict(events=EVENT_CODES, **(meta or dict())))
+        self.stop_event.clear()
+        self.writer = threading.Thread(
+            target=self._write_forever, daemon=True)
+        self.writer.start()
+
+        LOGGER.debug('Recording into {} every {} seconds'.format(
+            self.path, self.flush_interval))
+
+    def _encode(self, text, field):
+        """Encode the text for the field, the encoded text is cached.
+        It warns if the text is truncated, and if the truncated text is the same as another one.
+
+        Args:
+            text (str): The text, None refers the empty.
+            field (str): The field of RECORD_DTYPE.
+
+        Returns:
+            bytes: The encoded text.
+        """
+        raw = self.encoded.get(text)
+        if raw is not None:
+            return raw
+
+        raw, truncated = encode_text(str(text), RECORD_DTYPE[field].itemsize)
+        if truncated:
+            LOGGER.warning('The {} is truncated into {} bytes: {}'.format(
+                field, len(raw), text))
+            other = self.truncated.setdefault((field, raw), text)
+            if other != text:
+                LOGGER.warning('The truncated {} is the same as the {}: {}'.format(
+                    field, other, text))
+
+        self.encoded[text] = raw
+        return raw
+
+    def record(self, event, time, frame_idx=-1, img_id=None, code=None,
+               scheduled_ns=-1, pre_imshow_ns=-1, post_imshow_ns=-1,
+               post_pollkey_ns=-1, trigger_ns=-1, depth=-1):
+        """Record the event into the next row of the ring.
+
+        Args:
+            event (str): The name of the event, refers EVENT_CODES.
+            time (float): The time of the event.
+            frame_idx (int, optional): The index of the frame. Defaults to -1.
+            img_id (str, optional): The img_id of the key frame. Defaults to None.
+            code (str, optional): The code of the key press, or the trigger code of the skipped key frame. Defaults to None.
+            scheduled_ns (int, optional): The scheduled time of the frame. Defaults to -1.
+            pre_imshow_ns (int, optional): The time before the cv2.imshow. Defaults to -1.
+            post_imshow_ns (int, optional): The time after the cv2.imshow. Defaults to -1.
+            post_pollkey_ns (int, optional): The time after the cv2.pollKey. Defaults to -1.
+            trigger_ns (int, optional): The time of the trigger sending. Defaults to -1.
+            depth (int, optional): The key frames in the buffer. Defaults to -1.
+        """
+        with self.lock:
+            row = self.records[self.count % self.capacity]
+            row['time'] = time
+            row['event'] = EVENT_CODES[event]
+            row['frame_idx'] = frame_idx
+            row['img_id'] = self._encode(img_id, 'img_id')
+            row['code'] = self._encode(code, 'code')
+            row['scheduled_ns'] = scheduled_ns
+            row['pre_imshow_ns'] = pre_imshow_ns
+            row['post_imshow_ns'] = post_imshow_ns
+            row['post_pollkey_ns'] = post_pollkey_ns
+            row['trigger_ns'] = trigger_ns
+            row['depth'] = depth
+            self.count += 1
+
+    def _pending(self):
+        """Copy the records not flushed, it is called with the lock.
+
+        Returns:
+            np.Array: The records in the order of the recording.
+        """
+        begin = max(self.flushed, self.count - self.capacity)
+        self.dropped += begin - self.flushed
+        self.flushed = self.count
+
+        idx = np.arange(begin, self.count) % self.capacity
+        return self.records[idx]
+
+    def flush(self):
+        """Append the new records to the session log in one batch."""
+        with self.lock:
+            batch = self._pending()
+
+        if self.file is not None:
+            self.file.write(batch)
+
+    def _write_forever(self):
+        while not self.stop_event.wait(self.flush_interval):
+            self.flush()
+
+    def stop(self):
+        """Stop the background writer, the rest records are flushed."""
+        if self.writer is None:
+            return
+
+        self.stop_event.set()
+        self.writer.join()
+        self.writer = None
+
+        self.flush()
+        self.file.close()
+        self.file = None
+
+        LOGGER.debug('Recording stopped: {}'.format(self.report()))
+
+    def to_records(self):
+        """All the records, they are read from the session log if it is used.
+
+        Returns:
+            np.Array: The records in RECORD_DTYPE.
+        """
+        if self.path is not None:
+            return read_records(self.path)
+
+        with self.lock:
+            begin = max(0, self.count - self.capacity)
+            idx = np.arange(begin, self.count) % self.capacity
+            return self.records[idx]
+
+    def report(self):
+        """Report the counters.
+
+        Returns:
+            dict: The report.
+        """
+        return dict(
+            count=self.count,
+            flushed=self.flushed,
+            dropped=self.dropped,
+        )
+
+
+def read_records(path):
+    """Read the records from the session log written by the RecordingSink.
+
+    Args:
+        path (Path): The session log.
+
+    Returns:
+        np.Array: The records.
+    """
+    meta, records = read_session_log(path)
+    return records
+
+
+def records_to_table(records):
+    """Convert the records into the table of the time_recording.csv.
+
+    Args:
+        records (np.Array): The records in RECORD_DTYPE.
+
+    Returns:
+        pd.DataFrame: The table with the columns of time, imgId, frameIdx, recordEvent and code,
+                      the columns of TIMING_COLUMNS and bufferDepth follow if they are recorded.
+    """
+    def text(column):
+        return [e.decode(errors='replace') or None for e in column]
+
+    event = [EVENT_NAMES.get(int(e), '') for e in records['event']]
+    display = np.array([e in ('displayImage', 'skippedKeyFrame') for e in event], dtype=bool)
+
+    table = pd.DataFrame(dict(
+        time=records['time'],
+        imgId=text(records['img_id']),
+        frameIdx=np.where(display, records['frame_idx'], np.nan),
+        recordEvent=event,
+        code=text(records['code']),
+    ))
+
+    # The timing columns, NaN refers not available
+    for name, column in TIMING_COLUMNS.items():
+        if name in records.dtype.names:
+            table[column] = pd.arrays.IntegerArray(
+                records[name].astype(np.int64), records[name] < 0)
+
+    if 'depth' in records.dtype.names:
+        table['bufferDepth'] = np.where(
+            records['depth'] >= 0, records['depth'], np.nan)
+
+    return table
+
+
+def convert_session_log(log_path, csv_path=None):
+    """Convert the session log into the csv file in the schema of time_recording.csv.
+
+    Args:
+        log_path (Path): The session log.
+        csv_path (Path, optional): The csv file. Defaults to None, refers the log_path with the .csv suffix.
+
+    Returns:
+        pd.DataFrame: The table.
+    """
+    log_path = Path(log_path)
+    if csv_path is None:
+        csv_path = log_path.with_suffix('.csv')
+
+    table = records_to_table(read_records(log_path))
+    table.to_csv(csv_path)
+
+    LOGGER.debug('Converted {} records from {} to {}'.format(
+        len(table), log_path, csv_path))
+
+    return table
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Convert the session log into the time_recording.csv')
+    parser.add_argument('log', type=Path, help='The session log')
+    parser.add_argument('-o', '--output', type=Path, default=None,
+                        help='The csv file, defaults to the log with the .csv suffix')
+    args = parser.parse_args()
+
+    print(convert_session_log(args.log, args.output))
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
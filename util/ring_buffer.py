@@ -0,0 +1,198 @@
+"""
+File: ring_buffer.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Fixed-capacity ring buffer of preallocated frame slots
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import time
+import numpy as np
+
+from .logger import LOGGER
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class FrameRingBuffer(object):
+    """The single-producer / single-consumer ring buffer of frame slots.
+
+    Every slot holds the m frames of one key frame,
+    the frames are preallocated in uint8 with the shape of
+    (capacity, m, height, width, 3).
+
+    The protocol is lock-free, since
+    - the head is only written by the producer;
+    - the tail is only written by the consumer;
+    - the counters are monotonic, the slot is counter % capacity.
+
+    The producer uses reserve() -> write into the slot -> commit(img_id),
+    the consumer uses pop(), the popped slot is held by the consumer
+    until the next pop(), so it is safe to draw on it.
+    """
+
+    def __init__(self, capacity, m, shape, frames=None):
+        """Init the ring buffer.
+
+        Args:
+            capacity (int): The number of slots.
+            m (int): The frames in every slot.
+            shape (tuple): The shape of the frame, (height, width, 3).
+            frames (np.Array, optional): The external storage of the slots, the shape is (capacity, m, height, width, 3). Defaults to None, refers allocating a new one.
+        """
+        if frames is None:
+            frames = np.zeros((capacity, m) + tuple(shape), dtype=np.uint8)
+
+        assert frames.shape == (capacity, m) + tuple(shape), \
+            'The frames shape {} mismatches the buffer'.format(frames.shape)
+
+        self.capacity = capacity
+        self.m = m
+        self.shape = tuple(shape)
+        self.frames = frames
+        self.ids = [None for _ in range(capacity)]
+
+        # The counters
+        self.head = 0
+        self.tail = 0
+        self.held = 0
+        self.underrun = 0
+        self.overrun = 0
+
+        LOGGER.debug('Ring buffer with {} slots of {} frames {}'.format(
+            capacity, m, self.shape))
+
+    @property
+    def size(self):
+        """The number of the committed and not popped slots."""
+        return self.head - self.tail - self.held
+
+    def is_full(self):
+        """Whether the producer has no free slot."""
+        return self.head - self.tail >= self.capacity
+
+    def free(self):
+        """The number of the free slots for the producer."""
+        return self.capacity - (self.head - self.tail)
+
+    def reserve_index(self, offset=0):
+        """Reserve the free slot ahead of the head for the producer.
+
+        The offset allows the producer to write several slots at once,
+        they are committed in the order of the offset.
+
+        Args:
+            offset (int, optional): The offset from the head. Defaults to 0.
+
+        Returns:
+            int: The index of the slot, None refers the buffer is full, and the overrun is counted.
+        """
+        if offset >= self.free():
+            self.overrun += 1
+            return None
+        return (self.head + offset) % self.capacity
+
+    def reserve(self, offset=0):
+        """Reserve the free slot ahead of the head for the producer.
+
+        Args:
+            offset (int, optional): The offset from the head. Defaults to 0.
+
+        Returns:
+            np.Array: The frames of the slot, the shape is (m, height, width, 3), None refers the buffer is full, and the overrun is counted.
+        """
+        slot = self.reserve_index(offset)
+        if slot is None:
+            return None
+        return self.frames[slot]
+
+    def commit(self, img_id):
+        """Commit the reserved slot to the consumer.
+
+        Args:
+            img_id (str): The img_id of the key frame of the slot.
+        """
+        self.ids[self.head % self.capacity] = img_id
+        self.head += 1
+
+    def release(self):
+        """Release the held slot back to the producer."""
+        if self.held:
+            self.held = 0
+            self.tail += 1
+
+    def pop(self, block=True, timeout=None, spin_interval=0.0001, cancel=None):
+        """Pop the next slot for the consumer.
+
+        The previous popped slot is released.
+
+        Args:
+            block (bool, optional): Whether wait for the producer when the buffer is empty. Defaults to True.
+            timeout (float, optional): The seconds of waiting in the block mode. Defaults to None, refers waiting forever.
+            spin_interval (float, optional): The seconds of sleep between the checks. Defaults to 0.0001.
+            cancel (callable, optional): The waiting stops when it returns True. Defaults to None.
+
+        Returns:
+            img_id (str): The img_id of the key frame, None refers under-run;
+            frames (np.Array): The frames of the slot, None refers under-run.
+        """
+        self.release()
+
+        if self.head == self.tail:
+            self.underrun += 1
+
+            if not block:
+                return None, None
+
+            tic = time.perf_counter()
+            while self.head == self.tail:
+                if timeout is not None and time.perf_counter() - tic > timeout:
+                    return None, None
+                if cancel is not None and cancel():
+                    return None, None
+                time.sleep(spin_interval)
+
+        slot = self.tail % self.capacity
+        self.held = 1
+        return self.ids[slot], self.frames[slot]
+
+    def report(self):
+        """Report the counters.
+
+        Returns:
+            dict: The counters.
+        """
+        return dict(
+            capacity=self.capacity,
+            size=self.size,
+            head=self.head,
+            tail=self.tail,
+            underrun=self.underrun,
+            overrun=self.overrun,
+        )
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,207 @@
+"""
+File: scheduler.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Deadline-based frame scheduler with the hybrid sleep and spin waiting
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import time
+
+from .logger import LOGGER
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class DeadlineScheduler(object):
+    """The scheduler of the frames at the absolute deadlines.
+
+    The deadline of the idx-th frame is start_ns + idx * interval_ns,
+    so the slow frame never pushes the later frames back,
+    and the drift does not build up in the long session.
+
+    The waiting is the coarse time.sleep() until the spin_margin_ns before the deadline,
+    and the busy spin on the perf_counter_ns for the rest,
+    since the sleep may oversleep by the timer resolution of the OS.
+
+    The policy of the late frames is
+    - catch_up: the late frames are displayed without waiting, until the schedule is caught up;
+    - skip: the frames whose next deadline is passed are dropped, refers due().
+
+    The interval_ns of 0 refers the frames are displayed as fast as possible,
+    there is no deadline, so the frames are never late and the drift is not accounted.
+    """
+
+    def __init__(self, interval_ns, spin_margin_ns=2000000, policy='catch_up'):
+        """Init the scheduler.
+
+        Args:
+            interval_ns (int): The interval of the frames in nanoseconds, 0 refers no deadline.
+            spin_margin_ns (int, optional): The busy spin before the deadline in nanoseconds. Defaults to 2000000, refers 2 milliseconds.
+            policy (str, optional): The policy of the late frames, 'catch_up' or 'skip'. Defaults to 'catch_up'.
+        """
+        assert policy in ('catch_up', 'skip'), 'Unknown policy: {}'.format(policy)
+
+        self.interval_ns = int(interval_ns)
+        self.spin_margin_ns = int(spin_margin_ns)
+        self.policy = policy
+        self.start_ns = None
+
+        # The drift statistics
+        self.count = 0
+        self.late = 0
+        self.dropped = 0
+        self.drift_sum = 0
+        self.drift_sum_sq = 0
+        self.drift_max = 0
+        self.drift_last = 0
+
+    def start(self, start_ns=None):
+        """Start the schedule, the 0-th frame is due at once.
+
+        Args:
+            start_ns (int, optional): The perf_counter_ns of the start. Defaults to None, refers now.
+
+        Returns:
+            int: The start_ns.
+        """
+        self.start_ns = time.perf_counter_ns() if start_ns is None else start_ns
+
+        LOGGER.debug('Scheduler starts at {} ns, the interval is {} ns with the {} policy'.format(
+            self.start_ns, self.interval_ns, self.policy))
+
+        return self.start_ns
+
+    def deadline(self, idx):
+        """The deadline of the idx-th frame.
+
+        Args:
+            idx (int): The index of the frame.
+
+        Returns:
+            int: The deadline in perf_counter_ns.
+        """
+        return self.start_ns + idx * self.interval_ns
+
+    def due(self, idx, limit=None):
+        """The index of the frame to be displayed next.
+
+        In the skip policy, the frames are dropped if the deadline of the following frame is passed,
+        so the returned index is the latest frame whose deadline is passed.
+        In the catch_up policy, the idx is returned.
+
+        Args:
+            idx (int): The index of the next frame in the order.
+            limit (int, optional): The index of the last frame, the returned index is clamped to it before the dropped frames are counted. Defaults to None.
+
+        Returns:
+            int: The index of the frame to be displayed, it is not less than idx.
+        """
+        if self.policy == 'skip' and self.interval_ns > 0:
+            current = (time.perf_counter_ns() - self.start_ns) // self.interval_ns
+            if limit is not None:
+                current = min(current, limit)
+            if current > idx:
+                self.dropped += current - idx
+                return current
+
+        return idx
+
+    def wait(self, idx):
+        """Wait until the deadline of the idx-th frame,
+        it returns at once if the deadline is passed.
+
+        Args:
+            idx (int): The index of the frame.
+
+        Returns:
+            int: The deadline in perf_counter_ns, -1 refers no deadline.
+        """
+        self.count += 1
+
+        # The free-running frames have no deadline
+        if self.interval_ns <= 0:
+            return -1
+
+        deadline = self.start_ns + idx * self.interval_ns
+        now = time.perf_counter_ns()
+
+        # Coarse sleep
+        remaining = deadline - self.spin_margin_ns - now
+        if remaining > 0:
+            time.sleep(remaining / 1e9)
+
+        # Fine spin
+        now = time.perf_counter_ns()
+        while now < deadline:
+            now = time.perf_counter_ns()
+
+        drift = now - deadline
+        self.drift_sum += drift
+        self.drift_sum_sq += drift * drift
+        self.drift_last = drift
+        if drift > self.drift_max:
+            self.drift_max = drift
+        if drift > self.interval_ns:
+            self.late += 1
+
+        return deadline
+
+    def report(self):
+        """Report the drift statistics, the drift is how late the wait returns after the deadline.
+
+        Returns:
+            dict: The report, the drift is in milliseconds, the late and the drift are None if there is no deadline.
+        """
+        report = dict(
+            policy=self.policy,
+            frames=self.count,
+            late=None,
+            dropped=self.dropped,
+            drift_mean_ms=None,
+            drift_std_ms=None,
+            drift_max_ms=None,
+            drift_last_ms=None,
+        )
+
+        if self.interval_ns <= 0:
+            return report
+
+        n = max(self.count, 1)
+        mean = self.drift_sum / n
+        std = max(self.drift_sum_sq / n - mean * mean, 0) ** 0.5
+
+        report.update(
+            late=self.late,
+            drift_mean_ms=mean / 1e6,
+            drift_std_ms=std / 1e6,
+            drift_max_ms=self.drift_max / 1e6,
+            drift_last_ms=self.drift_last / 1e6,
+        )
+        return report
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,262 @@
+"""
+File: session_cache.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Precomputed full-session frame cache on disk
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import json
+import time
+import hashlib
+import numpy as np
+
+from pathlib import Path
+from tqdm.auto import tqdm
+
+from .logger import LOGGER
+from .compose import Compositor
+from .crossfade import CrossfadeEngine
+
+# The version of the compiled session format,
+# bump it when the rendering of the frames changes, so the old files are recompiled.
+SESSION_FORMAT_VERSION = 2
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def flip_value(frame_idx, m):
+    """The value of the flip block of the frame.
+
+    - m > 1 refers linear interpolating with the value, it is white when key frame is displayed;
+    - m == 1 refers no interpolating, it flips between white and black in frames.
+
+    Args:
+        frame_idx (int): The index of the frame in the session.
+        m (int): The frames between the key frames.
+
+    Returns:
+        int: The value of the flip block, 255 or 0.
+    """
+    if m > 1:
+        return 255 if frame_idx % m == 0 else 0
+    return 255 if frame_idx % 2 == 0 else 0
+
+
+def session_fingerprint(key_frames, ids, m, key_frames_count, compositor, flip_rect=None, preroll=1):
+    """Compute the fingerprint of the session.
+
+    The session is fully determined by the key frames, their order, the m,
+    the composing and the flip block, and the SESSION_FORMAT_VERSION of the rendering.
+    The key frames are hashed with all their pixels.
+
+    Args:
+        key_frames (list): The uint8 key frames.
+        ids (list): The img_id of the key frames.
+        m (int): The frames between the key frames.
+        key_frames_count (int): The number of the key frames to display.
+        compositor (Compositor): The compositor of the frames.
+        flip_rect (tuple, optional): The (x, y, width, height) of the flip block. Defaults to None.
+        preroll (int, optional): The key frames without the flip block. Defaults to 1.
+
+    Returns:
+        str: The hex digest of the fingerprint.
+    """
+    md5 = hashlib.md5()
+    md5.update(json.dumps(dict(
+        version=SESSION_FORMAT_VERSION,
+        ids=list(ids),
+        m=m,
+        key_frames_count=key_frames_count,
+        shape=list(key_frames[0].shape),
+        frame_shape=list(compositor.frame_shape),
+        image_shape=list(compositor.image_shape),
+        bgr=list(compositor.bgr),
+        dst=[[s.start, s.stop] for s in compositor.dst],
+        src=[[s.start, s.stop] for s in compositor.src],
+        flip_rect=None if flip_rect is None else list(flip_rect),
+        preroll=preroll,
+    )).encode())
+
+    for mat in key_frames:
+        md5.update(np.ascontiguousarray(mat).data)
+
+    return md5.hexdigest()
+
+
+def compile_session(image_stack, m, key_frames_count, path, compositor=None, flip_rect=None, preroll=1):
+    """Render every frame of the session into the memory-mapped file.
+
+    The key frame k crossfades along the index schedule of the stack,
+    as the VeryFastVeryStableBuffer in the player does.
+    The frames are composed at the screen resolution by the compositor,
+    so the file is as large as key_frames_count * m full-screen frames.
+    The flip block is baked into the frames after the preroll key frames,
+    refers flip_value(), the frame index of the session starts after the preroll.
+    The existing file is reused if the fingerprint matches.
+
+    Args:
+        image_stack (ImageStack): The stack of the images.
+        m (int): The frames between the key frames.
+        key_frames_count (int): The number of the key frames to display.
+        path (Path): The path of the frames file (.npy), the index is saved aside in .json.
+        compositor (Compositor, optional): The compositor of the frames. Defaults to None, refers the frames are the key frames.
+        flip_rect (tuple, optional): The (x, y, width, height) of the flip block in the frame. Defaults to None, refers no flip block.
+        preroll (int, optional): The leading key frames without the flip block, they are the 'Press any key' frames. Defaults to 1.
+
+    Returns:
+        Path: The path of the frames file.
+    """
+    path = Path(path)
+    index_path = path.with_suffix('.json')
+
+    key_frames = image_stack.stack
+    ids = image_stack.ids
+    shape = key_frames[0].shape
+
+    if compositor is None:
+        compositor = Compositor((shape[1], shape[0]), shape)
+
+    fingerprint = session_fingerprint(
+        key_frames, ids, m, key_frames_count, compositor, flip_rect, preroll)
+
+    if path.is_file() and index_path.is_file():
+        index = json.loads(index_path.read_text())
+        if index.get('fingerprint') == fingerprint:
+            LOGGER.debug('Reuse the compiled session {}'.format(path))
+            return path
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    tic = time.time()
+    schedule = image_stack.schedule(key_frames_count + 1)
+    frames = np.lib.format.open_memmap(
+        path, mode='w+', dtype=np.uint8,
+        shape=(key_frames_count * m, ) + compositor.frame_shape)
+
+    engine = CrossfadeEngine(compositor.shape, m)
+    key_ids = []
+    for k in tqdm(range(key_frames_count), 'Compile session'):
+        block = compositor.paint_background(frames[k * m:(k + 1) * m])
+        engine.blend(compositor.source(key_frames[schedule[k]]),
+                     compositor.source(key_frames[schedule[k + 1]]),
+                     compositor.inner(block))
+        key_ids.append(ids[schedule[k]])
+
+        if flip_rect is not None and k >= preroll:
+            x, y, w, h = flip_rect
+            for j, frame in enumerate(block):
+                frame[y:y + h, x:x + w] = flip_value((k - preroll) * m + j, m)
+
+    frames.flush()
+    del frames
+
+    index_path.write_text(json.dumps(dict(
+        fingerprint=fingerprint,
+        version=SESSION_FORMAT_VERSION,
+        m=m,
+        flip_block=flip_rect is not None,
+        shape=list(compositor.frame_shape),
+        key_ids=key_ids,
+    ), indent=2))
+
+    LOGGER.debug('Compiled session ({} frames) into {} in {:0.2f} seconds'.format(
+        key_frames_count * m, path, time.time() - tic))
+
+    return path
+
+
+class SessionCache(object):
+    """The player of the compiled session.
+
+    It replaces the VeryFastVeryStableBuffer in the player,
+    the frames are memory-mapped in copy-on-write mode,
+    so drawing on them never changes the file.
+    """
+
+    def __init__(self, path):
+        """Open the compiled session.
+
+        Args:
+            path (Path): The path of the frames file (.npy).
+        """
+        path = Path(path)
+        index = json.loads(path.with_suffix('.json').read_text())
+
+        self.path = path
+        self.m = index['m']
+        self.key_ids = index['key_ids']
+        self.flip_block = index.get('flip_block', False)
+        self.frames = np.load(path, mmap_mode='c')
+        self.position = 0
+
+        LOGGER.debug('Opened compiled session {}, {} key frames'.format(
+            path, len(self.key_ids)))
+
+    @property
+    def size(self):
+        """The number of the key frames left."""
+        return len(self.key_ids) - self.position
+
+    def start(self):
+        """Nothing to start, for the compatibility of the buffer."""
+        return
+
+    def stop(self):
+        """Nothing to stop, for the compatibility of the buffer."""
+        return
+
+    def pop(self, block=True):
+        """Pop the m frames of the next key frame.
+
+        Args:
+            block (bool, optional): Not used, for the compatibility of the buffer.
+
+        Returns:
+            id (str): The img_id of the key frame, None refers the session is over;
+            mats (np.Array): The m frames, the shape is (m, height, width, 3), None refers the session is over.
+        """
+        k = self.position
+        if k >= len(self.key_ids):
+            return None, None
+
+        self.position += 1
+        return self.key_ids[k], self.frames[k * self.m:(k + 1) * self.m]
+
+    def report(self):
+        """Report the position of the session.
+
+        Returns:
+            dict: The report.
+        """
+        return dict(
+            path=str(self.path),
+            key_frames=len(self.key_ids),
+            position=self.position,
+        )
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
@@ -0,0 +1,161 @@
+"""
+File: session_log.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Append-only binary session log of the fixed-width records
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import os
+import json
+import struct
+import numpy as np
+
+from pathlib import Path
+
+from .logger import LOGGER
+
+# The file starts with the magic, the version and the length of the json header,
+# the json header is padded to the 8 bytes boundary,
+# the fixed-width records are appended after it.
+MAGIC = b'RSVPLOG\x00'
+VERSION = 1
+PREFIX = struct.Struct('<8sII')
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def _encode_header(dtype, meta):
+    raw = json.dumps(dict(descr=dtype.descr, meta=meta)).encode()
+    raw += b' ' * (-(PREFIX.size + len(raw)) % 8)
+    return PREFIX.pack(MAGIC, VERSION, len(raw)) + raw
+
+
+def _decode_dtype(descr):
+    # The json turns the tuples into the lists
+    return np.dtype([tuple(e) for e in descr])
+
+
+class SessionLogWriter(object):
+    """The writer of the session log.
+
+    The header is written when the file is opened,
+    then the records are appended in batches.
+    Every batch is flushed to the disk at once,
+    so the records written before the crash are kept.
+    """
+
+    def __init__(self, path, dtype, meta=None, fsync=True):
+        """Open the session log, the existing file is truncated.
+
+        Args:
+            path (Path): The path of the log.
+            dtype (np.dtype): The dtype of the fixed-width records.
+            meta (dict, optional): The json-able meta information in the header. Defaults to None.
+            fsync (bool, optional): Whether fsync the file after every batch. Defaults to True.
+        """
+        self.path = Path(path)
+        self.dtype = np.dtype(dtype)
+        self.fsync = fsync
+        self.written = 0
+
+        self.file = open(self.path, 'wb')
+        self.file.write(_encode_header(self.dtype, meta or dict()))
+        self._flush()
+
+        LOGGER.debug('Opened session log {} with {} bytes records'.format(
+            self.path, self.dtype.itemsize))
+
+    def _flush(self):
+        self.file.flush()
+        if self.fsync:
+            os.fsync(self.file.fileno())
+
+    def write(self, records):
+        """Append the records.
+
+        Args:
+            records (np.Array): The records in the dtype.
+        """
+        assert records.dtype == self.dtype, 'The records dtype mismatches the log'
+
+        if len(records) == 0:
+            return
+
+        records.tofile(self.file)
+        self._flush()
+        self.written += len(records)
+
+    def close(self):
+        """Close the log."""
+        if self.file is None:
+            return
+
+        self._flush()
+        self.file.close()
+        self.file = None
+
+        LOGGER.debug('Closed session log {} with {} records'.format(
+            self.path, self.written))
+
+
+def read_session_log(path):
+    """Read the session log,
+    the partial record at the end of the crashed session is ignored.
+
+    Args:
+        path (Path): The path of the log.
+
+    Raises:
+        ValueError: The file is not the session log.
+
+    Returns:
+        meta (dict): The meta information in the header;
+        records (np.Array): The records.
+    """
+    path = Path(path)
+
+    with open(path, 'rb') as f:
+        magic, version, length = PREFIX.unpack(f.read(PREFIX.size))
+
+        if magic != MAGIC:
+            raise ValueError('Not a session log: {}'.format(path))
+
+        if version > VERSION:
+            raise ValueError('Unknown session log version {}: {}'.format(
+                version, path))
+
+        header = json.loads(f.read(length))
+        dtype = _decode_dtype(header['descr'])
+        offset = PREFIX.size + length
+
+    count = (path.stat().st_size - offset) // dtype.itemsize
+    records = np.fromfile(path, dtype=dtype, count=count, offset=offset)
+
+    return header['meta'], records
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
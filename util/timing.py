@@ -0,0 +1,113 @@
+"""
+File: timing.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    High-resolution monotonic clock and per-frame latency breakdown
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import time
+import numpy as np
+import pandas as pd
+
+from .logger import LOGGER
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+class MonotonicClock(object):
+    """The clock of the session, it is the time.perf_counter_ns.
+
+    The perf_counter_ns never jumps and has the finest resolution,
+    it is anchored to the wall clock once when the clock is created,
+    so the timestamps are convertible into the wall time in seconds.
+    """
+
+    def __init__(self):
+        # Anchor in the middle of the two wall clock reads
+        t1 = time.time_ns()
+        ns = time.perf_counter_ns()
+        t2 = time.time_ns()
+        self.offset_ns = (t1 + t2) // 2 - ns
+
+        LOGGER.debug('Monotonic clock is anchored with the offset {} ns'.format(
+            self.offset_ns))
+
+    # The perf_counter_ns is the plain function to save the attribute lookups
+    now_ns = staticmethod(time.perf_counter_ns)
+
+    def to_time(self, ns):
+        """Convert the perf_counter_ns into the wall time.
+
+        Args:
+            ns (int): The perf_counter_ns timestamp.
+
+        Returns:
+            float: The wall time in seconds, as the time.time().
+        """
+        return (ns + self.offset_ns) / 1e9
+
+    def now(self):
+        """The current wall time from the monotonic clock.
+
+        Returns:
+            float: The wall time in seconds.
+        """
+        return self.to_time(time.perf_counter_ns())
+
+
+def latency_breakdown(records):
+    """Break down the latency of the displayed frames.
+
+    The stages are
+    - late: pre_imshow - scheduled, the frame is late for the schedule, NaN refers no deadline;
+    - imshow: post_imshow - pre_imshow, the cost of the cv2.imshow;
+    - poll_key: post_pollkey - post_imshow, the cost of the cv2.pollKey;
+    - trigger: trigger - post_imshow, the delay of the trigger sending, NaN refers no trigger.
+
+    Args:
+        records (np.Array): The records in the RECORD_DTYPE.
+
+    Returns:
+        pd.DataFrame: The stages in milliseconds and the buffer depth, one row per displayed frame.
+    """
+    records = records[records['pre_imshow_ns'] >= 0]
+
+    def stage(begin, end):
+        ms = (records[end] - records[begin]) / 1e6
+        return np.where((records[begin] >= 0) & (records[end] >= 0), ms, np.nan)
+
+    return pd.DataFrame(dict(
+        frameIdx=records['frame_idx'],
+        late=stage('scheduled_ns', 'pre_imshow_ns'),
+        imshow=stage('pre_imshow_ns', 'post_imshow_ns'),
+        poll_key=stage('post_imshow_ns', 'post_pollkey_ns'),
+        trigger=stage('post_imshow_ns', 'trigger_ns'),
+        depth=records['depth'],
+    ))
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
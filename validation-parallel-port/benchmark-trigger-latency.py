@@ -0,0 +1,200 @@
+"""
+File: benchmark-trigger-latency.py
+Author: Chuncheng Zhang
+Date: 2023-07-28
+Copyright & Email: chuncheng.zhang@ia.ac.cn
+
+Purpose:
+    Measure the trigger path from Parallel.send to the edge on the simulated port,
+    the latency distribution, the pulse width and the merge / drop counts.
+
+    python validation-parallel-port/benchmark-trigger-latency.py --count 500 --burst 3
+
+Functions:
+    1. Requirements and constants
+    2. Function and class
+    3. Play ground
+    4. Pending
+    5. Pending
+"""
+
+
+# %% ---- 2023-07-28 ------------------------
+# Requirements and constants
+import sys
+import json
+import time
+import argparse
+import numpy as np
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from util.parallel.parallel import Parallel  # noqa: E402
+
+# The codes are cycled
+CODES = [2, 4, 8, 16, 32]
+
+
+# %% ---- 2023-07-28 ------------------------
+# Function and class
+
+
+def percentiles(x):
+    """The summary of the values in milliseconds.
+
+    Args:
+        x (np.Array): The values in nanoseconds.
+
+    Returns:
+        dict: The summary.
+    """
+    if len(x) == 0:
+        return dict()
+
+    ms = np.asarray(x) / 1e6
+    return dict(
+        mean=float(ms.mean()),
+        std=float(ms.std()),
+        p50=float(np.percentile(ms, 50)),
+        p95=float(np.percentile(ms, 95)),
+        p99=float(np.percentile(ms, 99)),
+        max=float(ms.max()),
+    )
+
+
+def match_edges(sent_codes, sent_ns, edge_codes, edge_ns):
+    """Match the rising edges to the sends in the FIFO order.
+
+    Every edge is matched to the earliest unmatched send of the same code before it,
+    the sends skipped over are dropped, and the edge without the send is merged,
+    so one lost pulse never shifts the matching of the following ones.
+
+    Args:
+        sent_codes (list): The sent codes.
+        sent_ns (list): The perf_counter_ns of the sends.
+        edge_codes (np.Array): The values of the rising edges.
+        edge_ns (np.Array): The perf_counter_ns of the rising edges.
+
+    Returns:
+        pairs (list): The matched (send index, edge index);
+        merged (int): The edges matching no send;
+        dropped (int): The sends matching no edge.
+    """
+    pairs = []
+    merged = 0
+    cursor = 0
+
+    for j, (code, t) in enumerate(zip(edge_codes, edge_ns)):
+        i = cursor
+        while i < len(sent_codes) and sent_ns[i] <= t and sent_codes[i] != code:
+            i += 1
+
+        if i < len(sent_codes) and sent_ns[i] <= t:
+            pairs.append((i, j))
+            cursor = i + 1
+        else:
+            merged += 1
+
+    dropped = len(sent_codes) - len(pairs)
+    return pairs, merged, dropped
+
+
+def run(count=500, burst=1, interval_ms=5, mode='queue', pulse_width=0.001, min_gap=0.001):
+    """Send the codes into the simulated port and match them with the edges.
+
+    Args:
+        count (int, optional): The number of the sending. Defaults to 500.
+        burst (int, optional): The codes sent at the same time in the queue mode. Defaults to 1.
+        interval_ms (float, optional): The interval of the sending in milliseconds. Defaults to 5.
+        mode (str, optional): The sending mode, 'queue' or 'inline'. Defaults to 'queue'.
+        pulse_width (float, optional): The width of the pulse in seconds. Defaults to 0.001.
+        min_gap (float, optional): The min gap between the pulses in seconds. Defaults to 0.001.
+
+    Returns:
+        dict: The report.
+    """
+    parallel = Parallel(pulse_width=pulse_width, min_gap=min_gap)
+    parallel.reset('0', backend='simulated')
+    port = parallel.port
+
+    sent_codes = []
+    sent_ns = []
+
+    for i in range(count):
+        tic = time.perf_counter_ns()
+        if mode == 'inline':
+            code = CODES[i % len(CODES)]
+            sent_codes.append(code)
+            sent_ns.append(time.perf_counter_ns())
+            parallel.send_inline(code)
+        else:
+            for j in range(burst):
+                code = CODES[(i * burst + j) % len(CODES)]
+                sent_codes.append(code)
+                sent_ns.append(time.perf_counter_ns())
+                parallel.send(code, verbose=False)
+
+        while time.perf_counter_ns() < tic + interval_ms * 1e6:
+            time.sleep(0.0005)
+
+    parallel.close(timeout=10)
+
+    # The rising edges are the writes of the non-zero values,
+    # the pulse ends at the next write of zero.
+    times, values = port.edges()
+    rising = np.flatnonzero(values != 0)
+    complete = rising[(rising + 1 < len(values))]
+    complete = complete[values[complete + 1] == 0]
+
+    pairs, merged, dropped = match_edges(sent_codes, sent_ns, values[rising], times[rising])
+    sent_idx = np.array([i for i, _ in pairs], dtype=int)
+    edge_idx = rising[np.array([j for _, j in pairs], dtype=int)]
+
+    return dict(
+        mode=mode,
+        burst=burst if mode == 'queue' else 1,
+        sent=len(sent_codes),
+        rising_edges=len(rising),
+        matched=len(pairs),
+        merged=merged,
+        dropped=dropped,
+        overwritten_edges=port.dropped(),
+        latency_ms=percentiles(times[edge_idx] - np.array(sent_ns, dtype=np.int64)[sent_idx]),
+        pulse_width_ms=percentiles(times[complete + 1] - times[complete]),
+        gap_ms=percentiles(times[rising[1:]] - times[rising[:-1] + 1]),
+    )
+
+
+# %% ---- 2023-07-28 ------------------------
+# Play ground
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Trigger latency benchmark on the simulated parallel port')
+    parser.add_argument('--count', type=int, default=500,
+                        help='The number of the sending')
+    parser.add_argument('--burst', type=int, default=1,
+                        help='The codes sent at the same time in the queue mode')
+    parser.add_argument('--interval', type=float, default=5,
+                        help='The interval of the sending in milliseconds')
+    parser.add_argument('--mode', default='queue', choices=['queue', 'inline'],
+                        help='The sending mode')
+    parser.add_argument('--pulse-width', type=float, default=0.001,
+                        help='The width of the pulse in seconds')
+    parser.add_argument('--min-gap', type=float, default=0.001,
+                        help='The min gap between the pulses in seconds')
+    args = parser.parse_args()
+
+    report = run(count=args.count, burst=args.burst, interval_ms=args.interval,
+                 mode=args.mode, pulse_width=args.pulse_width, min_gap=args.min_gap)
+
+    print(json.dumps(report, indent=2))
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending
+
+
+# %% ---- 2023-07-28 ------------------------
+# Pending